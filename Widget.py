@@ -1,13 +1,24 @@
+import argparse
 import tkinter as tk
-from tkinter import messagebox, simpledialog
-import json
-import os
-from datetime import datetime, timedelta
+from tkinter import filedialog, messagebox
+
+import client
+import clock
+import metrics
+import progression
+import recurring
+import task_catalog
+import xp_log
+from engine import Engine
+from progression import xp_for_level
+from task import Task, format_hhmm, to_minutes
 
 PROFILE_PATH = "profile.json"
 SCHEDULE_PATH = "schedule.json"
 TASKS_PATH = "tasks.json"
-LOG_PATH = "xp_log.txt"
+LOG_PATH = xp_log.LOG_PATH
+FLUSH_DELAY_MS = 2000
+DEBUG_REFRESH_MS = 1000
 
 QUOTES = [
     "You can do it. Keep going.",
@@ -28,42 +39,91 @@ QUOTES = [
 # ---------- Utility Functions ----------
 
 
-def load_json(path, default):
-    if not os.path.exists(path):
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(default, f)
-    with open(path, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-
-def save_json(path, data):
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4)
-
-
-def xp_for_level(level):
-    return 100 * level + 200
-
-
-def calculate_level(xp):
-    lvl = 1
-    total = xp_for_level(lvl)
-    while xp >= total:
-        lvl += 1
-        total += xp_for_level(lvl)
-    return lvl, xp_for_level(lvl)
-
-
 def draw_bar(current, maximum):
     width = 20
     filled = int((current / maximum) * width) if maximum else 0
     return '[' + '=' * filled + ' ' * (width - filled) + ']'
 
+
+def format_row(t):
+    return f"[{t.icon}] {t.name} at {format_hhmm(t.start)} for {t.duration}m"
+
+# ---------- Widgets ----------
+
+
+class VirtualList:
+    # A Listbox holding only the visible window of a long list. Rows are
+    # built on demand by row_text(i) and patched in place when they change,
+    # so refreshing costs O(height) Tk calls regardless of the list length.
+
+    def __init__(self, parent, height=10, **options):
+        self.frame = tk.Frame(parent, bg=options.get("bg"))
+        self.listbox = tk.Listbox(self.frame, height=height, **options)
+        self.scrollbar = tk.Scrollbar(self.frame, command=self.yview)
+        self.listbox.pack(side=tk.LEFT)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox.bind("<MouseWheel>",
+                          lambda e: self.scroll(-1 if e.delta > 0 else 1))
+        self.listbox.bind("<Button-4>", lambda e: self.scroll(-1))
+        self.listbox.bind("<Button-5>", lambda e: self.scroll(1))
+        self.height = height
+        self.top = 0
+        self.count = 0
+        self.row_text = None
+        self.shown = []
+        self.thumb = None
+
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    def refresh(self, count, row_text):
+        self.count = count
+        self.row_text = row_text
+        self.patch()
+
+    def patch(self):
+        self.top = max(0, min(self.top, self.count - self.height))
+        rows = [self.row_text(i) for i in
+                range(self.top, min(self.count, self.top + self.height))]
+        for slot, text in enumerate(rows):
+            if slot >= len(self.shown):
+                self.listbox.insert(tk.END, text)
+            elif self.shown[slot] != text:
+                self.listbox.delete(slot)
+                self.listbox.insert(slot, text)
+        if len(self.shown) > len(rows):
+            self.listbox.delete(len(rows), tk.END)
+        self.shown = rows
+
+        thumb = (self.top / self.count, (self.top + len(rows)) / self.count) \
+            if self.count else (0, 1)
+        if thumb != self.thumb:
+            self.scrollbar.set(*thumb)
+            self.thumb = thumb
+
+    def selected(self):
+        # Position in the whole list of the selected row, or None
+        slots = self.listbox.curselection()
+        return self.top + slots[0] if slots else None
+
+    def scroll(self, rows):
+        self.top += rows
+        self.patch()
+        return "break"
+
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * self.count)
+        elif args[0] == "scroll":
+            step = self.height if args[2] == "pages" else 1
+            self.top += int(args[1]) * step
+        self.patch()
+
 # ---------- Main Application ----------
 
 
 class XPApp:
-    def __init__(self, root):
+    def __init__(self, root, stats=False):
         self.root = root
         self.root.title("Perfect You")
         self.root.geometry("400x460")
@@ -71,22 +131,36 @@ class XPApp:
         self.root.attributes("-topmost", True)
         self.root.configure(bg="#1e1e1e")
 
-        # Load or initialize data
-        self.profile = load_json(PROFILE_PATH, {
-            "username": "You", "xp": 0, "love_xp": 0,
-            "level": 1, "xp_history": [0] * 7,
-            "last_active": datetime.now().strftime("%Y-%m-%d"),
-            "earned_xp_display": 0, "lost_xp_display": 0
-        })
-        self.schedule = load_json(SCHEDULE_PATH, [])
-        self.tasks = load_json(TASKS_PATH, {"tasks": []}).get("tasks", [])
+        # A running daemon (daemon.py) owns the state; otherwise load our own
+        self.engine = client.connect(clock.now())
+        if self.engine:
+            self.root.tk.createfilehandler(
+                self.engine, tk.READABLE, lambda *args: self.on_push())
+        else:
+            self.engine = Engine({
+                "username": "You", "xp": 0, "love_xp": 0,
+                "level": 1, "xp_history": [0] * 7,
+                "last_active": clock.now().strftime("%Y-%m-%d"),
+                "earned_xp_display": 0, "lost_xp_display": 0
+            }, profile_path=PROFILE_PATH, schedule_path=SCHEDULE_PATH,
+                log_path=LOG_PATH)
+        self.after_id = None
+        self.flush_id = None
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
 
         # Quote rotation
         self.quote_index = 0
-        self.last_quote_time = datetime.now()
+        self.last_quote_time = clock.now()
+
+        # Last text set on each label, so unchanged labels are not touched
+        self.texts = {}
+        # The debug pane's window, while it is open (F12 toggles it)
+        self.debug = None
 
         self.build_ui()
         self.refresh_loop()
+        if stats:
+            self.toggle_debug()
 
     def build_ui(self):
         frm = tk.Frame(self.root, bg="#1e1e1e")
@@ -109,7 +183,8 @@ class XPApp:
         self.next_label.pack()
 
         # Schedule list
-        self.schedule_box = tk.Listbox(frm, width=50, bg="#2e2e2e", fg="white")
+        self.schedule_box = VirtualList(
+            frm, width=48, bg="#2e2e2e", fg="white")
         self.schedule_box.pack(pady=10)
 
         # Stats & gains/losses
@@ -133,154 +208,337 @@ class XPApp:
         btns.pack(pady=5)
         tk.Button(btns, text="Add Task", command=self.add_task).pack(
             side=tk.LEFT, padx=5)
+        tk.Button(btns, text="Recurring", command=self.add_recurring).pack(
+            side=tk.LEFT, padx=5)
         tk.Button(btns, text="View XP Log", command=self.view_log).pack(
             side=tk.LEFT, padx=5)
+        self.confirm_button = tk.Button(
+            btns, text="Confirm", command=self.confirm_tasks)
+        self.confirm_button.pack(side=tk.LEFT, padx=5)
+        self.root.bind("<F12>", lambda event: self.toggle_debug())
 
     def refresh_loop(self):
-        now = datetime.now()
-        current_task = None
-        next_task = None
-        earned = lost = 0
-        lines = []
-
-        # Process each scheduled task
-        for t in self.schedule:
-            start = datetime.strptime(t["start"], "%Y-%m-%d %H:%M")
-            end = start + timedelta(minutes=t["duration"])
-            if t["status"] == "⏳":
-                if start <= now < end:
-                    current_task = t
-                    t["status"] = "🕒"
-                elif now >= end:
-                    done = messagebox.askyesno(
-                        "Task Complete", f"Did you complete '{t['name']}'?")
-                    if done:
-                        t["status"] = "✓"
-                        self.profile["xp"] += t["xp"]
-                        earned += t["xp"]
-                        lines.append(
-                            f"{now.strftime('%Y-%m-%d %H:%M')} - ✅ {t['name']} (+{t['xp']} XP)")
-                    else:
-                        t["status"] = "X"
-                        penalty = t["xp"] // 2
-                        self.profile["xp"] = max(
-                            0, self.profile["xp"] - penalty)
-                        lost += penalty
-                        lines.append(
-                            f"{now.strftime('%Y-%m-%d %H:%M')} - ❌ {t['name']} (-{penalty} XP)")
-                elif not next_task:
-                    next_task = t
-
-        # Append to log
-        if lines:
-            with open(LOG_PATH, 'a', encoding='utf-8') as logf:
-                logf.write(f"\n=== {now.strftime('%Y-%m-%d')} ===\n")
-                for entry in lines:
-                    logf.write(entry + "\n")
-
-        # Update profile stats
-        lvl, _ = calculate_level(self.profile["xp"])
-        self.profile["level"] = lvl
-        self.profile.setdefault("earned_xp_display", 0)
-        self.profile.setdefault("lost_xp_display", 0)
-        self.profile["earned_xp_display"] += earned
-        self.profile["lost_xp_display"] += lost
-        save_json(PROFILE_PATH, self.profile)
-        save_json(SCHEDULE_PATH, self.schedule)
+        now = clock.now()
+
+        # Start due tasks, queue finished ones and save; confirm_tasks
+        # resolves them
+        self.engine.tick(now)
 
         # Refresh UI and schedule next update
-        self.update_ui(current_task, next_task)
-        self.root.after(1000, self.refresh_loop)
+        index = self.engine.index
+        self.update_ui(index.current(now), index.upcoming(now))
+        self.schedule_wakeup()
+
+    def flush(self):
+        if self.flush_id:
+            self.root.after_cancel(self.flush_id)
+            self.flush_id = None
+        self.engine.flush()
+
+    def request_flush(self):
+        # Coalesce bursts of edits into one write
+        if not self.flush_id:
+            self.flush_id = self.root.after(FLUSH_DELAY_MS, self.flush)
+
+    def close(self):
+        self.flush()
+        self.root.destroy()
+
+    def schedule_wakeup(self):
+        if self.after_id:
+            self.root.after_cancel(self.after_id)
+        delay = self.engine.ticker.delay(clock.now())
+        self.after_id = self.root.after(int(delay * 1000) + 1, self.on_wakeup)
+
+    def on_wakeup(self):
+        self.after_id = None
+        now = clock.now()
+        if self.engine.wake(now):
+            self.refresh_loop()
+        else:
+            # Clock tick only: nothing to evaluate or persist
+            index = self.engine.index
+            self.update_ui(index.current(now), index.upcoming(now))
+            self.schedule_wakeup()
+
+    def on_push(self):
+        # The daemon pushed a delta into the mirror
+        try:
+            changed = self.engine.poll()
+        except ConnectionError as e:
+            messagebox.showerror("Perfect You", str(e))
+            self.root.destroy()
+            return
+        if changed:
+            now = clock.now()
+            index = self.engine.index
+            self.update_ui(index.current(now), index.upcoming(now))
+
+    def set_text(self, label, text):
+        if self.texts.get(label) != text:
+            label.config(text=text)
+            self.texts[label] = text
 
     def update_ui(self, current, upcoming):
+        with metrics.timed("render"):
+            self.render(current, upcoming)
+        metrics.gauge("pending_prompts", len(self.engine.queue))
+        metrics.flush_due()
+
+    def render(self, current, upcoming):
+        import forecast
+
         # XP and Level display
-        lvl = self.profile["level"]
-        xp = self.profile["xp"]
+        lvl = self.engine.profile["level"]
+        xp = self.engine.profile["xp"]
         need = xp_for_level(lvl + 1)
         bar = draw_bar(xp, need)
-        avg = sum(self.profile.get("xp_history", [])[-7:]) / \
-            max(1, len(self.profile.get("xp_history", [])))
-        rem = need - xp
-        eta = f"{round(rem/avg,1)} days" if avg > 0 else "⚠️ Negative XP trend"
-        self.user_label.config(
-            text=f"👤 {self.profile['username']} | 🧬 L{lvl} | XP:{xp}/{need}\n"
-                 f"📅 {datetime.now():%Y-%m-%d} 🕒 {datetime.now():%H:%M:%S}  🔋 {bar}"
+        history = self.engine.profile.get("xp_history", [])
+        avg = progression.average_xp(history)
+        eta = forecast.format_eta(
+            forecast.level_eta(self.engine.profile, self.engine.log, clock.now().date()))
+        self.set_text(
+            self.user_label,
+            f"👤 {self.engine.profile['username']} | 🧬 L{lvl} | XP:{xp}/{need}\n"
+            f"📅 {clock.now():%Y-%m-%d} 🕒 {clock.now():%H:%M}  🔋 {bar}"
         )
 
         # Love XP bar
-        love_xp = self.profile.get("love_xp", 0)
-        self.love_label.config(
-            text=f"💖 Love XP: {draw_bar(love_xp,200)} {love_xp}/200"
-        )
+        love_xp = self.engine.profile.get("love_xp", 0)
+        self.set_text(
+            self.love_label, f"💖 Love XP: {draw_bar(love_xp,200)} {love_xp}/200")
 
         # Current and Next tasks
-        self.task_label.config(
-            text=f"🔴 Current: {current['name']}" if current else "🔴 Current: None")
+        self.set_text(
+            self.task_label,
+            f"🔴 Current: {current.name}" if current else "🔴 Current: None")
         if upcoming:
-            name = upcoming.get("name", "?")
-            time = upcoming.get("start", "")[-5:]
-            self.next_label.config(text=f"🟡 Next: {name} at {time}")
+            self.set_text(
+                self.next_label,
+                f"🟡 Next: {upcoming.name} at {format_hhmm(upcoming.start)}")
         else:
-            self.next_label.config(text="🟡 Next: None")
+            self.set_text(self.next_label, "🟡 Next: None")
 
         # XP stats and gains/losses
-        self.xp_stats.config(text=f"📈 Avg/day:{int(avg)} | ETA:{eta}")
-        self.gain_label.config(text=f"📈 +{self.profile['earned_xp_display']}")
-        self.loss_label.config(text=f"💀 -{self.profile['lost_xp_display']}")
-
-        # Schedule list
-        self.schedule_box.delete(0, tk.END)
-        for t in self.schedule:
-            self.schedule_box.insert(
-                tk.END,
-                f"[{t['status']}] {t['name']} at {t['start'][-5:]} for {t['duration']}m"
-            )
+        self.set_text(self.xp_stats, f"📈 Avg/day:{int(avg)} | ETA:{eta}")
+        self.set_text(
+            self.gain_label, f"📈 +{self.engine.profile['earned_xp_display']}")
+        self.set_text(
+            self.loss_label, f"💀 -{self.engine.profile['lost_xp_display']}")
+
+        # Schedule list: only the visible rows are formatted and patched
+        self.schedule_box.refresh(
+            len(self.engine.schedule),
+            lambda i: format_row(self.engine.schedule[i]))
+
+        # Confirmation backlog
+        pending = len(self.engine.queue)
+        self.set_text(
+            self.confirm_button, f"Confirm ({pending})" if pending else "Confirm")
+        state = 'normal' if pending else 'disabled'
+        if self.confirm_button.cget('state') != state:
+            self.confirm_button.config(state=state)
 
         # Rotate motivational quote
-        if (datetime.now() - self.last_quote_time).total_seconds() > 1800:
+        if (clock.now() - self.last_quote_time).total_seconds() > 1800:
             self.quote_index = (self.quote_index + 1) % len(QUOTES)
-            self.last_quote_time = datetime.now()
-        self.quote_label.config(text=QUOTES[self.quote_index])
+            self.last_quote_time = clock.now()
+        self.set_text(self.quote_label, QUOTES[self.quote_index])
 
     def add_task(self):
-        if not self.tasks:
+        catalog = task_catalog.load(TASKS_PATH)
+        if not catalog.tasks:
             messagebox.showinfo("No Tasks", "You have no predefined tasks.")
             return
-        opts = "\n".join(
-            [f"{i+1}. {t['name']}({t['duration']}m/{t['xp']}XP)" for i, t in enumerate(self.tasks)])
-        idx = simpledialog.askinteger("Add Task", f"Select task:\n{opts}")
-        if not idx or idx < 1 or idx > len(self.tasks):
-            return
-        hr = simpledialog.askinteger("Start Hour", "Hour? (0-23)")
-        if hr is None or hr < 0 or hr > 23:
+        w = tk.Toplevel(self.root)
+        w.title("Add Task")
+        tk.Label(w, text="Search tasks:").pack(padx=10, pady=(5, 0), anchor="w")
+        query = tk.Entry(w, width=40)
+        query.pack(padx=10, fill='x')
+        # Only the visible rows of the matches are built
+        picker = VirtualList(w, width=48)
+        picker.pack(padx=10, pady=5)
+        row = tk.Frame(w)
+        row.pack(pady=5)
+        tk.Label(row, text="Start hour (0-23):").pack(side=tk.LEFT)
+        hour = tk.Entry(row, width=4)
+        hour.pack(side=tk.LEFT, padx=5)
+        results = [catalog.tasks]
+
+        def show(*args):
+            results[0] = catalog.search(query.get())
+            picker.top = 0
+            picker.refresh(len(results[0]),
+                           lambda i: task_catalog.format_task(results[0][i]))
+
+        def add():
+            i = picker.selected()
+            hr = int(hour.get()) if hour.get().strip().isdigit() else -1
+            if i is None or i >= len(results[0]) or not 0 <= hr <= 23:
+                messagebox.showwarning(
+                    "Add Task", "Select a task and an hour from 0 to 23.", parent=w)
+                return
+            sel = results[0][i]
+            st = clock.now().replace(hour=hr, minute=0, second=0, microsecond=0)
+            entry = Task(sel['name'], to_minutes(st), sel['duration'], sel['xp'])
+            if not self.engine.add(entry, clock.now()):
+                messagebox.showwarning(
+                    "Conflict", f"'{sel['name']}' at {hr:02d}:00 overlaps.", parent=w)
+                return
+            self.request_flush()
+            self.schedule_wakeup()
+
+        query.bind("<KeyRelease>", show)
+        tk.Button(row, text="Add", command=add).pack(side=tk.LEFT, padx=5)
+        query.focus_set()
+        show()
+
+    def add_recurring(self):
+        w = tk.Toplevel(self.root)
+        w.title("Recurring Tasks")
+        tk.Label(w, text="Name, days and times, e.g. Gym Mon/Wed/Fri 07:00").pack(
+            padx=10, pady=(5, 0))
+        spec = tk.Entry(w, width=40)
+        spec.pack(padx=10, pady=5)
+
+        def apply(rows):
+            added, errors = self.engine.import_templates(rows, clock.now())
+            message = f"Added {added} recurring task(s)."
+            if errors:
+                message += "\n\n" + "\n".join(errors[:10])
+            messagebox.showinfo("Recurring Tasks", message, parent=w)
+            self.request_flush()
+            self.refresh_loop()
+
+        def import_file():
+            path = filedialog.askopenfilename(parent=w, filetypes=[
+                ("Schedules", "*.csv *.ics"), ("All files", "*.*")])
+            if path:
+                apply(recurring.read_file(path))
+
+        btns = tk.Frame(w)
+        btns.pack(pady=5)
+        tk.Button(btns, text="Add",
+                  command=lambda: apply([(1, recurring.parse_spec(spec.get()))])).pack(
+            side=tk.LEFT, padx=5)
+        tk.Button(btns, text="Import File…", command=import_file).pack(
+            side=tk.LEFT, padx=5)
+
+    def confirm_tasks(self):
+        if not self.engine.queue:
             return
-        sel = self.tasks[idx-1]
-        st = datetime.now().replace(hour=hr, minute=0, second=0, microsecond=0)
-        self.schedule.append({
-            "name": sel['name'],
-            "start": st.strftime("%Y-%m-%d %H:%M"),
-            "duration": sel['duration'],
-            "xp": sel['xp'],
-            "status": "⏳"
-        })
-        save_json(SCHEDULE_PATH, self.schedule)
+        tasks = list(self.engine.queue)
+        w = tk.Toplevel(self.root)
+        w.title("Confirm Tasks")
+        tk.Label(w, text="Select the tasks you completed:").pack(pady=(5, 0))
+        box = tk.Listbox(w, selectmode=tk.MULTIPLE, width=50,
+                         height=min(15, len(tasks)))
+        for t in tasks:
+            box.insert(tk.END, f"{t.name} ended {format_hhmm(t.end)} (+{t.xp} XP)")
+        box.pack(padx=10, pady=5)
+
+        def apply_selection():
+            selected = set(box.curselection())
+            apply({t: i in selected for i, t in enumerate(tasks)})
+
+        def apply(outcomes):
+            self.engine.resolve(outcomes, clock.now())
+            w.destroy()
+            self.refresh_loop()
+
+        btns = tk.Frame(w)
+        btns.pack(pady=5)
+        tk.Button(btns, text="All Done",
+                  command=lambda: apply({t: True for t in tasks})).pack(side=tk.LEFT, padx=5)
+        tk.Button(btns, text="All Missed",
+                  command=lambda: apply({t: False for t in tasks})).pack(side=tk.LEFT, padx=5)
+        tk.Button(btns, text="Apply Selection",
+                  command=apply_selection).pack(side=tk.LEFT, padx=5)
 
     def view_log(self):
-        if not os.path.exists(LOG_PATH):
+        if not self.engine.log.exists():
             messagebox.showinfo("XP Log", "No log.")
             return
-        content = open(LOG_PATH, 'r', encoding='utf-8').read()
         w = tk.Toplevel(self.root)
         w.title("XP Log")
         txt = tk.Text(w, wrap='word')
-        txt.insert('1.0', content)
+        nav = tk.Frame(w)
+        older = tk.Button(nav, text="Older")
+        newer = tk.Button(nav, text="Newer")
+        stats = tk.Button(nav, text="Stats", command=self.view_stats)
+        page = [0]
+
+        # Only one page of the log is read and shown at a time, newest first
+        def show(step):
+            page[0] += step
+            entries, has_older = self.engine.log.tail_page(page[0])
+            txt.config(state='normal')
+            txt.delete('1.0', tk.END)
+            txt.insert('1.0', "\n".join(xp_log.format_page(entries)).lstrip())
+            txt.config(state='disabled')
+            older.config(state='normal' if has_older else 'disabled')
+            newer.config(state='normal' if page[0] > 0 else 'disabled')
+
+        older.config(command=lambda: show(1))
+        newer.config(command=lambda: show(-1))
+        older.pack(side=tk.LEFT, padx=5)
+        newer.pack(side=tk.LEFT, padx=5)
+        stats.pack(side=tk.LEFT, padx=5)
+        nav.pack(pady=5)
+        txt.pack(expand=True, fill='both')
+        show(0)
+
+    def toggle_debug(self):
+        if self.debug:
+            self.debug.destroy()
+            self.debug = None
+            return
+        w = self.debug = tk.Toplevel(self.root)
+        w.title("Debug")
+        w.protocol("WM_DELETE_WINDOW", self.toggle_debug)
+        text = tk.Label(w, justify="left", anchor="w", font=("Courier", 9))
+        text.pack(padx=10, pady=5, fill='x')
+        if metrics.PROFILER[0]:
+            tk.Button(w, text="Top Functions", command=self.view_profile).pack(pady=5)
+
+        # Refreshed while open, independently of the app's wakeups
+        def refresh():
+            if self.debug is w:
+                text.config(text="\n".join(metrics.overlay_lines()))
+                w.after(DEBUG_REFRESH_MS, refresh)
+        refresh()
+
+    def view_profile(self):
+        lines = metrics.profile_top()
+        metrics.dump_profile()
+        w = tk.Toplevel(self.root)
+        w.title("Profile")
+        txt = tk.Text(w, wrap='none', font=("Courier", 9))
+        txt.insert('1.0', "\n".join(lines))
+        txt.config(state='disabled')
+        txt.pack(expand=True, fill='both')
+
+    def view_stats(self):
+        import analytics
+
+        stats = analytics.load_stats(self.engine.log, clock.now().date())
+        lines = analytics.format_stats(stats, recurring.load_catalog(TASKS_PATH))
+        w = tk.Toplevel(self.root)
+        w.title("Stats")
+        txt = tk.Text(w, wrap='none', font=("Courier", 10))
+        txt.insert('1.0', "\n".join(lines))
+        txt.config(state='disabled')
         txt.pack(expand=True, fill='both')
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="The Perfect You tray widget.")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.apply_arguments(args)
     try:
         root = tk.Tk()
-        app = XPApp(root)
+        app = XPApp(root, args.stats)
         root.mainloop()
     except Exception:
         import traceback
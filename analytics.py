@@ -0,0 +1,405 @@
+import json
+import os
+import sys
+from array import array
+from datetime import date, timedelta
+
+import recurring
+from progression import DECAY, load_numpy
+from store import load_json, save_json
+from task import EPOCH, parse_minutes
+from xp_log import entry_start
+
+CACHE_PATH = "stats_cache.json"
+COLUMNS_PATH = "stats_columns.npz"
+VERSION = 2         # of what the cache and the columns hold
+DAY_MINUTES = 24 * 60
+ROLLING_DAYS = (7, 30)
+TREND_DAYS = 30     # the trend is the slope over this many days
+DECAY_WINDOW = 365  # older XP has decayed to nothing (0.9 ** 365 ~ 1e-17)
+SHADES = " ░▒▓█"
+# array.array codes of the minute, task, xp and done columns without NumPy
+LIST_TYPES = ("q", "i", "q", "b")
+
+# -------------- History --------------
+
+
+class History:
+    # The XP log as parallel columns (task start minute, task id, xp, done)
+    # plus the interned task names and the log cursor they were read up to.
+    # The columns are NumPy arrays, kept in COLUMNS_PATH, or without NumPy
+    # array.array columns, kept as raw bytes beside it (see columns_file).
+    # Either way each update only parses entries appended since the last
+    # one.
+
+    def __init__(self, np=None, source=""):
+        self.np = np
+        self.source = source
+        self.names = []
+        self.ids = {}
+        self.cursor = 0
+        self.minute, self.task, self.xp, self.done = (
+            array(code) for code in LIST_TYPES)
+        if np is not None:
+            self.minute, self.task, self.xp, self.done = (
+                np.zeros(0, np.int64), np.zeros(0, np.int32),
+                np.zeros(0, np.int64), np.zeros(0, bool))
+
+    def __len__(self):
+        return len(self.minute)
+
+    def update(self, log):
+        entries, self.cursor = log.entries_since(self.cursor)
+        columns = ([], [], [], [])
+        days = {}  # only each day's midnight is parsed as a date
+        for entry in entries:
+            name = entry["task"]
+            if name not in self.ids:
+                self.ids[name] = len(self.names)
+                self.names.append(name)
+            text = entry_start(entry)
+            if text[:10] not in days:
+                days[text[:10]] = parse_minutes(text[:10] + " 00:00")
+            columns[0].append(days[text[:10]] + int(text[11:13]) * 60 + int(text[14:16]))
+            columns[1].append(self.ids[name])
+            columns[2].append(entry["xp"])
+            columns[3].append(entry["outcome"] == "done")
+        if self.np is None:
+            for column, new in zip((self.minute, self.task, self.xp, self.done), columns):
+                column.extend(new)
+        elif entries:
+            np = self.np
+            self.minute, self.task, self.xp, self.done = (
+                np.concatenate([old, np.asarray(new, old.dtype)]) for old, new in
+                zip((self.minute, self.task, self.xp, self.done), columns))
+        return len(entries)
+
+    def save(self, path=COLUMNS_PATH):
+        path = columns_file(self.np, path)
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as f:
+            if self.np is None:
+                header = {"version": VERSION, "source": self.source, "cursor": self.cursor,
+                          "names": self.names, "count": len(self)}
+                f.write(json.dumps(header).encode('utf-8') + b"\n")
+                for column in (self.minute, self.task, self.xp, self.done):
+                    column.tofile(f)
+            else:
+                self.np.savez(f, minute=self.minute, task=self.task, xp=self.xp,
+                              done=self.done, names=self.np.array(self.names, dtype=str),
+                              cursor=self.cursor, source=self.source, version=VERSION)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, np, source, path=COLUMNS_PATH):
+        history = cls(np, source)
+        path = columns_file(np, path)
+        if not os.path.exists(path):
+            return history
+        if np is None:
+            return history.load_lists(path)
+        try:
+            with np.load(path) as data:
+                if str(data["source"]) != source or int(data["version"]) != VERSION:
+                    return history
+                history.minute, history.task = data["minute"], data["task"]
+                history.xp, history.done = data["xp"], data["done"]
+                history.names = [str(name) for name in data["names"]]
+                history.cursor = int(data["cursor"])
+        except (OSError, KeyError, ValueError):
+            return cls(np, source)
+        history.ids = {name: i for i, name in enumerate(history.names)}
+        return history
+
+    def load_lists(self, path):
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                if header["source"] != self.source or header["version"] != VERSION:
+                    return self
+                for column in (self.minute, self.task, self.xp, self.done):
+                    column.fromfile(f, header["count"])
+        except (OSError, EOFError, KeyError, ValueError):
+            return History(None, self.source)
+        self.names = header["names"]
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.cursor = header["cursor"]
+        return self
+
+
+def columns_file(np, path):
+    # The .npz itself with NumPy; otherwise a file of raw array bytes,
+    # after a JSON header line, beside it
+    return path if np is not None else os.path.splitext(path)[0] + ".bin"
+
+# -------------- Stats --------------
+#
+# compute() returns plain JSON values:
+#   entries, first_day          how much history there is
+#   rolling {"7", "30", "all"}  average net XP per day over the last n days
+#   streak, best_streak         consecutive days with a completed task
+#   completion {name: [done, total]}
+#   heatmap                     7 x 24 success rates (Monday first), -1 = no data
+#   decayed_xp, trend           net XP with the daily decay applied, and its
+#                               slope in XP/day over the last TREND_DAYS
+
+
+def day_number(day):
+    return (day - EPOCH.date()).days
+
+
+def runs(active):
+    # (current, longest) run of True; an idle today does not break the run,
+    # so the current one may also end yesterday, but no earlier
+    best = run = before = 0
+    for flag in active:
+        before = run
+        run = run + 1 if flag else 0
+        best = max(best, run)
+    return run or before, best
+
+
+def slope(values):
+    # Least-squares slope of values against 0, 1, 2, ...
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    num = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+    return num / sum((x - mean_x) ** 2 for x in range(n))
+
+
+def compute_lists(history, today):
+    if not len(history):
+        return None
+    last = day_number(today)
+    first = min(min(history.minute) // DAY_MINUTES, last)
+    span = last - first + 1
+    daily = [0] * span
+    active = [False] * span
+    names = history.names
+    counts = {name: [0, 0] for name in names}
+    slots = [0] * (7 * 24)
+    hits = [0] * (7 * 24)
+    for minute, task, xp, done in zip(history.minute, history.task, history.xp, history.done):
+        day = minute // DAY_MINUTES
+        if day <= last:
+            daily[day - first] += xp
+            active[day - first] = active[day - first] or done
+        counts[names[task]][0] += done
+        counts[names[task]][1] += 1
+        slot = (day + 3) % 7 * 24 + minute % DAY_MINUTES // 60
+        slots[slot] += 1
+        hits[slot] += done
+
+    balance = []
+    value = 0.0
+    for xp in daily[-DECAY_WINDOW:]:
+        value = value * DECAY + xp
+        balance.append(value)
+    current, best = runs(active)
+    return {
+        "entries": len(history),
+        "first_day": (EPOCH.date() + timedelta(days=first)).isoformat(),
+        "rolling": {**{str(n): round(sum(daily[-n:]) / min(n, span), 2) for n in ROLLING_DAYS},
+                    "all": round(sum(daily) / span, 2)},
+        "streak": current,
+        "best_streak": best,
+        "completion": counts,
+        "heatmap": [[round(hits[s] / slots[s], 3) if slots[s] else -1
+                     for s in range(row * 24, row * 24 + 24)] for row in range(7)],
+        "decayed_xp": round(balance[-1], 1),
+        "trend": round(slope(balance[-TREND_DAYS:]), 2),
+    }
+
+
+def compute_numpy(np, history, today):
+    if not len(history):
+        return None
+    last = day_number(today)
+    minute = history.minute
+    day = minute // DAY_MINUTES
+    first = min(int(day.min()), last)
+    span = last - first + 1
+    past = day <= last
+    offset = day[past] - first
+    daily = np.bincount(offset, weights=history.xp[past], minlength=span)
+    active = np.bincount(offset, weights=history.done[past], minlength=span) > 0
+
+    # Runs of active days from the edges of the padded 0/1 sequence
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], active.astype(np.int8), [0]))))
+    starts, ends = edges[0::2], edges[1::2]
+    best = int((ends - starts).max()) if len(starts) else 0
+    current = 0
+    if len(starts) and ends[-1] >= span - (0 if active[-1] or span < 2 else 1):
+        current = int(ends[-1] - starts[-1])
+
+    size = len(history.names)
+    done = np.bincount(history.task, weights=history.done, minlength=size).astype(np.int64)
+    total = np.bincount(history.task, minlength=size)
+
+    slot = (day + 3) % 7 * 24 + minute % DAY_MINUTES // 60
+    slots = np.bincount(slot, minlength=7 * 24)
+    hits = np.bincount(slot, weights=history.done, minlength=7 * 24)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        heatmap = np.where(slots > 0, np.round(hits / slots, 3), -1)
+
+    # b[t] = sum over s <= t of daily[s] * DECAY ** (t - s), in closed form
+    window = daily[-DECAY_WINDOW:]
+    steps = np.arange(len(window))
+    balance = np.cumsum(window * DECAY ** -steps) * DECAY ** steps
+    recent = balance[-TREND_DAYS:]
+    trend = np.polyfit(np.arange(len(recent)), recent, 1)[0] if len(recent) > 1 else 0.0
+    return {
+        "entries": len(history),
+        "first_day": (EPOCH.date() + timedelta(days=first)).isoformat(),
+        "rolling": {**{str(n): round(float(daily[-n:].sum()) / min(n, span), 2)
+                       for n in ROLLING_DAYS},
+                    "all": round(float(daily.sum()) / span, 2)},
+        "streak": current,
+        "best_streak": best,
+        "completion": {name: [int(d), int(t)] for name, d, t in zip(history.names, done, total)},
+        "heatmap": heatmap.reshape(7, 24).tolist(),
+        "decayed_xp": round(float(balance[-1]), 1),
+        "trend": round(float(trend), 2),
+    }
+
+
+def compute(history, today):
+    if history.np is None:
+        return compute_lists(history, today)
+    return compute_numpy(history.np, history, today)
+
+# -------------- Cache --------------
+
+
+def load_stats(log, today=None, cache_path=CACHE_PATH, columns_path=COLUMNS_PATH):
+    # Stats are recomputed at most once per day plus once per log change;
+    # otherwise this is a single small read
+    today = today or date.today()
+    source = type(log).__name__
+    cursor = log.cursor()
+    cached = load_json(cache_path, {})
+    if cached.get("day") == today.isoformat() and cached.get("source") == source \
+            and cached.get("cursor") == cursor and cached.get("version") == VERSION:
+        return cached["stats"]
+    history = History.load(load_numpy(), source, columns_path)
+    if history.cursor > cursor:
+        history = History(history.np, source)  # the log was rewritten
+    history.update(log)
+    history.save(columns_path)
+    stats = compute(history, today)
+    save_json(cache_path, {"day": today.isoformat(), "source": source, "version": VERSION,
+                           "cursor": history.cursor, "stats": stats})
+    return stats
+
+# -------------- Formatting --------------
+
+
+def format_stats(stats, catalog):
+    # Completion rows only for task types in tasks.json
+    if not stats:
+        return ["No XP history yet."]
+    rolling = stats["rolling"]
+    lines = [
+        f"📊 {stats['entries']} log entries since {stats['first_day']}",
+        f"📈 Avg XP/day: 7d {rolling['7']:+.0f} | 30d {rolling['30']:+.0f} | "
+        f"all {rolling['all']:+.0f}",
+        f"🔥 Streak: {stats['streak']} days (best {stats['best_streak']})",
+        f"📉 Decay-adjusted XP: {stats['decayed_xp']:.0f} "
+        f"(trend {stats['trend']:+.1f}/day over {TREND_DAYS} days)",
+        "",
+        "✅ Completion by task:",
+    ]
+    rows = sorted(((done / total, name, done, total)
+                   for name, (done, total) in stats["completion"].items()
+                   if name in catalog and total), reverse=True)
+    width = max((len(name) for _, name, _, _ in rows), default=0)
+    for rate, name, done, total in rows:
+        lines.append(f"   {name:<{width}}  {rate:4.0%} ({done}/{total})")
+    if not rows:
+        lines.append("   No catalog tasks logged yet.")
+    lines += ["", "🕒 Success by hour (░ low → █ high):",
+              "       0     6     12    18"]
+    for name, row in zip(recurring.DAY_NAMES, stats["heatmap"]):
+        cells = "".join("·" if rate < 0 else SHADES[min(4, int(rate * 5))] for rate in row)
+        lines.append(f"   {name.title()} {cells}")
+    return lines
+
+# -------------- Self Check --------------
+
+
+def synthetic_history(np, days=3 * 365, per_day=20, seed=1, idle=0):
+    # `days` days of entries, the last of them idle + 1 days before today
+    import random
+    rng = random.Random(seed)
+    history = History(np, "synthetic")
+    names = [f"Task {i}" for i in range(30)]
+    history.names = names
+    history.ids = {name: i for i, name in enumerate(names)}
+    start = day_number(date.today()) - days - idle
+    rows = []
+    for day in range(start, start + days):
+        if rng.random() < 0.1:
+            continue  # a day off
+        for _ in range(per_day):
+            done = rng.random() < 0.7
+            xp = rng.randrange(10, 40)
+            rows.append((day * DAY_MINUTES + rng.randrange(DAY_MINUTES),
+                         rng.randrange(len(names)), xp if done else -(xp // 2), done))
+    columns = [list(column) for column in zip(*rows)]
+    if np is None:
+        history.minute, history.task, history.xp, history.done = columns
+    else:
+        history.minute, history.task, history.xp, history.done = (
+            np.asarray(columns[0], np.int64), np.asarray(columns[1], np.int32),
+            np.asarray(columns[2], np.int64), np.asarray(columns[3], bool))
+    return history
+
+
+# (active days, expected (current, longest) runs)
+RUNS = [
+    ([], (0, 0)),
+    ([False], (0, 0)),
+    ([True], (1, 1)),
+    ([True, False], (1, 1)),
+    ([True, True, False, False], (0, 2)),
+    ([True, True, False, False, False, False], (0, 2)),
+    ([True, False, True, True, True], (3, 3)),
+    ([True, True, True, False, True, False], (1, 3)),
+]
+
+
+def check():
+    # None when there is no NumPy to compare the list stats with
+    for active, expected in RUNS:
+        assert runs(active) == expected, (active, runs(active))
+    np = load_numpy()
+    if np is None:
+        return None
+    today = date.today()
+    for days, idle in ((1, 0), (2, 0), (40, 0), (40, 1), (40, 5), (3 * 365, 0)):
+        fast = compute_numpy(np, synthetic_history(np, days, idle=idle), today)
+        slow = compute_lists(synthetic_history(None, days, idle=idle), today)
+        for key in ("decayed_xp", "trend"):
+            assert abs(fast.pop(key) - slow.pop(key)) < 0.1, (days, key)
+        assert fast == slow, (days, idle)
+    return len(synthetic_history(np))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--check"]:
+        count = check()
+        print("OK: streaks match; NumPy is not installed, so nothing to compare."
+              if count is None
+              else f"OK: NumPy and list stats match over {count} entries.")
+    elif not sys.argv[1:]:
+        import sqlite_store
+        from engine import open_log
+
+        for line in format_stats(load_stats(open_log(sqlite_store.connect())),
+                                 recurring.load_catalog()):
+            print(line)
+    else:
+        print("Usage: python analytics.py [--check]")
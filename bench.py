@@ -0,0 +1,739 @@
+import io
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from confirm import ConfirmQueue
+from schedule_index import ScheduleIndex
+from screen import Screen
+from task import Task, to_minutes
+
+# -------------- Synthetic Data --------------
+
+
+def make_profile():
+    return {
+        "username": "Bench", "xp": 12345, "love_xp": 80, "level": 15,
+        "last_active": datetime.now().strftime("%Y-%m-%d"),
+        "xp_history": [120, 90, 0, 150, 80, 110, 95],
+        "day_started": "", "can_schedule": True,
+        "earned_xp_display": 30, "lost_xp_display": 0
+    }
+
+
+def make_day(day, count=8):
+    base = to_minutes(datetime.combine(day, datetime.min.time()))
+    return [Task(f"Task {i}", base + (6 + i) * 60, 45, 25) for i in range(count)]
+
+# -------------- Benchmarks --------------
+
+
+def bench_render(ticks=60):
+    # One dashboard frame per simulated minute: the old path spawns
+    # `clear` and reprints everything, Screen only rewrites changed lines
+    import perfect_u
+
+    os.environ.setdefault("LINES", "60")
+    os.environ.setdefault("COLUMNS", "100")
+    profile = make_profile()
+    start = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    schedule = make_day(start.date())
+    index = ScheduleIndex(schedule)
+    frames = [perfect_u.dashboard_lines(profile, schedule, index, ConfirmQueue(),
+                                        start + timedelta(minutes=i), "12–30 days (P50–P90)")
+              for i in range(ticks)]
+
+    clear_cmd = "cls" if os.name == "nt" else "clear"
+    legacy_bytes = 0
+    began = time.perf_counter()
+    for lines in frames:
+        spawned = subprocess.run(clear_cmd, shell=True, stdout=subprocess.PIPE,
+                                 stderr=subprocess.DEVNULL)
+        legacy_bytes += len(spawned.stdout)
+        legacy_bytes += len(("\n".join(lines) + "\n").encode('utf-8'))
+    legacy_time = time.perf_counter() - began
+
+    screen = Screen(out=io.StringIO())
+    began = time.perf_counter()
+    for lines in frames:
+        screen.render(lines)
+    screen_time = time.perf_counter() - began
+
+    return {
+        "legacy_bytes_per_tick": legacy_bytes / ticks,
+        "legacy_spawns_per_tick": 1,
+        "legacy_ms_per_tick": legacy_time / ticks * 1000,
+        "screen_bytes_per_tick": screen.bytes_written / ticks,
+        "screen_spawns_per_tick": 0,
+        "screen_ms_per_tick": screen_time / ticks * 1000
+    }
+
+
+def bench_import(templates=20, days=365):
+    # A year of daily templates validated in one batch, instead of one
+    # add_tasks prompt per occurrence
+    import recurring
+
+    now = datetime.now()
+    first = (now + timedelta(days=1)).strftime("%Y-%m-%d")
+    until = (now + timedelta(days=days)).strftime("%Y-%m-%d")
+    rows = [(i + 1, {"name": f"Task {i}", "days": "daily", "times": f"{i:02d}:00",
+                     "duration": 45, "xp": 25, "from": first, "until": until})
+            for i in range(templates)]
+    index = ScheduleIndex(make_day(now.date()))
+    began = time.perf_counter()
+    accepted, errors = recurring.validate(rows, [], index, {}, now)
+    elapsed = time.perf_counter() - began
+    began = time.perf_counter()
+    count = sum(1 for _ in recurring.expand(accepted, now.date(), now.date() + timedelta(days=days)))
+    expand_time = time.perf_counter() - began
+    return {
+        "templates": len(accepted),
+        "rejected": len(errors),
+        "occurrences": count,
+        "validate_ms": elapsed * 1000,
+        "expand_ms": expand_time * 1000
+    }
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def bench_daemon(subscribers=128, updates=50):
+    # Fan-out latency: one client changes the profile and every subscriber
+    # times how long the resulting delta takes to reach it
+    from daemon import Daemon, encode
+    from engine import Engine
+
+    cwd = os.getcwd()
+    directory = tempfile.mkdtemp()
+    os.chdir(directory)
+    running = True
+
+    def serve():
+        while running:
+            daemon.step(0.05)
+
+    try:
+        now = datetime.now()
+        engine = Engine(make_profile(), now, clock_minutes=False)
+        for task in make_day(now.date()):
+            engine.add(task, now)
+        daemon = Daemon(engine, "bench.sock")
+        thread = threading.Thread(target=serve)
+        thread.start()
+
+        socks = []
+        for _ in range(subscribers):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect("bench.sock")
+            sock.sendall(encode({"op": "subscribe"}))
+            socks.append(sock)
+        streams = [sock.makefile("rb") for sock in socks]
+        for stream in streams:
+            stream.readline()  # snapshot
+
+        latencies = []
+        began = time.perf_counter()
+        for i in range(updates):
+            sent = time.perf_counter()
+            socks[0].sendall(encode({"op": "profile", "fields": {"love_xp": 1000 + i}}))
+            for stream in streams:
+                stream.readline()
+                latencies.append(time.perf_counter() - sent)
+        elapsed = time.perf_counter() - began
+
+        for stream, sock in zip(streams, socks):
+            stream.close()
+            sock.close()
+        running = False
+        thread.join()
+        daemon.close()
+    finally:
+        running = False
+        os.chdir(cwd)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "subscribers": subscribers,
+        "latency_p50_ms": percentile(latencies, 0.5) * 1000,
+        "latency_p99_ms": percentile(latencies, 0.99) * 1000,
+        "latency_max_ms": max(latencies) * 1000,
+        "updates_per_sec": updates / elapsed
+    }
+
+
+def bench_stats(days=3 * 365, per_day=20):
+    # Opening the stats view over years of history: the first open parses
+    # the whole log, later ones after a new entry only the appended tail,
+    # the first one of a day recomputes from the kept columns, and the
+    # rest of the day hits the per-day cache
+    import analytics
+    import xp_log
+
+    cwd = os.getcwd()
+    directory = tempfile.mkdtemp()
+    try:
+        os.chdir(directory)
+        start = datetime.now() - timedelta(days=days)
+        log = xp_log.LogFile()
+        log.append([xp_log.make_entry(start + timedelta(minutes=i * 1440 // per_day),
+                                      f"Task {i % 30}", "done" if i % 3 else "missed",
+                                      25 if i % 3 else -12)
+                    for i in range(days * per_day)])
+        timings = {}
+        for label in ("cold", "cached"):
+            began = time.perf_counter()
+            analytics.load_stats(log)
+            timings[label] = time.perf_counter() - began
+        log.append([xp_log.make_entry(datetime.now(), "Task 0", "done", 25)])
+        began = time.perf_counter()
+        analytics.load_stats(log)
+        timings["appended"] = time.perf_counter() - began
+        began = time.perf_counter()
+        analytics.load_stats(log, datetime.now().date() + timedelta(days=1))
+        timings["next_day"] = time.perf_counter() - began
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory, ignore_errors=True)
+    return {
+        "entries": days * per_day,
+        "cold_ms": timings["cold"] * 1000,
+        "cached_ms": timings["cached"] * 1000,
+        "appended_ms": timings["appended"] * 1000,
+        "next_day_ms": timings["next_day"] * 1000
+    }
+
+
+def bench_forecast(days=60):
+    # 100k trajectories (2k without NumPy) for a level a few days away, one
+    # that takes months, and one that is out of reach
+    import random
+    import forecast
+
+    rng = random.Random(1)
+    samples = [(rng.randrange(0, 900), rng.randrange(0, 40)) for _ in range(days)]
+    forecast.load_numpy()  # not the import
+    timings = {}
+    for label, xp in (("near", 0), ("far", 5000), ("unreachable", 50000)):
+        began = time.perf_counter()
+        result = forecast.simulate(xp, samples)
+        timings[f"{label}_ms"] = (time.perf_counter() - began) * 1000
+        timings[f"{label}_p90_days"] = result[0.9] or -1
+    return timings
+
+
+def bench_simulate(days=365):
+    # A year of scripted days through the real engine on a manual clock
+    import simulate
+
+    result = simulate.simulate(days, late=0.1, seed=1)
+    return {
+        "days": days,
+        "elapsed_ms": result["elapsed_ms"],
+        "ms_per_day": result["elapsed_ms"] / days,
+        "final_xp": result["xp"],
+        "final_level": result["level"]
+    }
+
+
+# -------------- Suite --------------
+#
+# The benchmarks below size their data from SIZES, set by --scale:
+# schedule entries, XP log megabytes and task catalog entries.
+
+SCALES = {
+    "small": {"schedule": 1000, "log_mb": 10, "catalog": 10000},
+    "large": {"schedule": 100000, "log_mb": 100, "catalog": 10000},
+    "extreme": {"schedule": 1000000, "log_mb": 1024, "catalog": 10000},
+}
+SIZES = SCALES["small"]
+RESULTS_PATH = "bench_results.json"
+TOLERANCE = 0.25
+# Changes smaller than this are noise whatever the ratio
+MIN_DELTA = {"ms": 0.5, "us": 5}
+
+
+@contextmanager
+def workdir():
+    # Runs the body in a fresh temporary directory
+    cwd = os.getcwd()
+    directory = tempfile.mkdtemp()
+    try:
+        os.chdir(directory)
+        yield directory
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def make_schedule(count, day):
+    # 16 non-overlapping 45-minute tasks a day from `day` on
+    base = to_minutes(datetime.combine(day, datetime.min.time()))
+    return [Task(f"Task {i % 50}", base + i // 16 * 1440 + (6 + i % 16) * 60, 45, 25)
+            for i in range(count)]
+
+
+def make_catalog(count):
+    return {"tasks": [{"name": f"Task {i}", "duration": 15 + i % 6 * 15, "xp": 10 + i % 5 * 5}
+                      for i in range(count)]}
+
+
+def make_log(path, megabytes, per_day=20):
+    # A JSON Lines XP log and its day index of about `megabytes`, ending
+    # today; written directly, as xp_log.append would take minutes for 1 GB
+    import xp_log
+
+    block = "".join(
+        json.dumps({"time": f"DAY {6 + i * 16 // per_day:02d}:{i * 7 % 60:02d}",
+                    "task": f"Task {i % 30}", "outcome": "done" if i % 4 else "missed",
+                    "xp": 25 if i % 4 else -12}) + "\n"
+        for i in range(per_day)).encode('utf-8')
+    days = megabytes * 2 ** 20 // len(block) + 1
+    start = datetime.now().date() - timedelta(days=days - 1)
+    with open(path, 'wb') as f, \
+            open(xp_log.index_path(path), 'w', encoding='utf-8') as index:
+        for offset in range(days):
+            day = (start + timedelta(days=offset)).isoformat()
+            index.write(f"{day}\t{f.tell()}\n")
+            f.write(block.replace(b"DAY", day.encode()))
+    return days
+
+
+def timed(func, repeat=1):
+    # Mean milliseconds per call
+    began = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - began) / repeat * 1000
+
+
+def bench_json():
+    # load_json/save_json of a single-document schedule and the catalog
+    from store import load_json, save_json
+
+    schedule = [t.to_dict() for t in make_schedule(SIZES["schedule"], datetime.now().date())]
+    catalog = make_catalog(SIZES["catalog"])
+    with workdir():
+        results = {
+            "schedule_save_ms": timed(lambda: save_json("schedule.json", schedule)),
+            "schedule_load_ms": timed(lambda: load_json("schedule.json", [])),
+            "schedule_bytes": os.path.getsize("schedule.json"),
+            "catalog_save_ms": timed(lambda: save_json("tasks.json", catalog)),
+            "catalog_load_ms": timed(lambda: load_json("tasks.json", {})),
+        }
+    return results
+
+
+def bench_catalog():
+    # Parsing the catalog, opening it again unchanged and picker searches
+    import task_catalog
+    from store import save_json
+
+    with workdir():
+        save_json("tasks.json", make_catalog(SIZES["catalog"]))
+        catalog = task_catalog.Catalog()
+        return {
+            "load_ms": timed(catalog.refresh),
+            "cached_us": timed(catalog.refresh, 100) * 1000,
+            "search_ms": timed(lambda: catalog.search("ta"), 10),
+            "narrow_ms": timed(lambda: (catalog.search("t"), catalog.search("task 9")), 10)
+        }
+
+
+def bench_startup(years=3):
+    # Engine start to first frame on a multi-year schedule: the first
+    # start splits a legacy schedule.json, later ones open only today;
+    # then one archived day read from the snapshot
+    import perfect_u
+    import snapshot
+    from engine import Engine
+    from store import save_json
+
+    now = datetime.now()
+    tasks = make_schedule(years * 365 * 16, (now - timedelta(days=years * 365)).date())
+    for task in tasks:
+        task.status = 2
+    profile = make_profile()
+    profile["last_active"] = now.strftime("%Y-%m-%d")
+
+    def start():
+        began = time.perf_counter()
+        engine = Engine({})
+        perfect_u.draw_ui(engine.profile, engine.schedule, engine.index, engine.queue,
+                          engine.log, Screen(out=io.StringIO()))
+        return (time.perf_counter() - began) * 1000
+
+    with workdir():
+        save_json("schedule.json", [t.to_dict() for t in tasks])
+        save_json("profile.json", profile)
+        first = start()
+        again = start()
+        day = tasks[len(tasks) // 2].day
+        with snapshot.Snapshot("schedule_archive/archive.snap") as snap:
+            read_day = timed(lambda: snap.day(day), 100)
+        size = os.path.getsize("schedule_archive/archive.snap")
+    return {
+        "tasks": len(tasks),
+        "legacy_start_ms": first,
+        "start_ms": again,
+        "archive_day_us": read_day * 1000,
+        "archive_bytes": size
+    }
+
+
+def bench_status(runs=5):
+    # What a shell prompt pays: status.py's own imports, then a whole
+    # `python status.py` run on a day of tasks
+    import status
+    from store import save_json
+
+    now = datetime.now()
+    script = os.path.abspath(status.__file__)
+    profile = make_profile()
+    profile["last_active"] = now.strftime("%Y-%m-%d")
+    with workdir():
+        os.makedirs(status.SCHEDULE_DIR)
+        save_json("profile.json", profile)
+        save_json(os.path.join(status.SCHEDULE_DIR, now.strftime("%Y-%m-%d") + ".json"),
+                  [t.to_dict() for t in make_day(now.date())])
+        best = None
+        for _ in range(runs):
+            began = time.perf_counter()
+            subprocess.run([sys.executable, script], capture_output=True, check=True)
+            took = (time.perf_counter() - began) * 1000
+            best = took if best is None else min(best, took)
+    return {
+        "import_ms": min(status.import_ms() for _ in range(3)),
+        "run_ms": best
+    }
+
+
+def bench_conflicts(probes=10000, adds=1000):
+    # What add_tasks costs per entry: an overlap check, then inserting
+    # into the index
+    import random
+
+    tasks = make_schedule(SIZES["schedule"], datetime.now().date())
+    began = time.perf_counter()
+    index = ScheduleIndex(tasks)
+    build = time.perf_counter() - began
+    rng = random.Random(1)
+    lo, hi = tasks[0].start, tasks[-1].end
+    starts = [rng.randrange(lo, hi) for _ in range(probes)]
+    began = time.perf_counter()
+    clashes = sum(bool(index.overlapping(start, start + 45)) for start in starts)
+    check = time.perf_counter() - began
+
+    # Five free minutes after each task
+    free = [Task("Extra", t.end + 1, 4, 5) for t in tasks[:adds]]
+    began = time.perf_counter()
+    for task in free:
+        if not index.overlapping(task.start, task.end):
+            index.add(task)
+    add = time.perf_counter() - began
+    return {
+        "entries": len(tasks),
+        "index_build_ms": build * 1000,
+        "check_us": check / probes * 1e6,
+        "clash_share": clashes / probes,
+        "add_us": add / len(free) * 1e6
+    }
+
+
+def bench_tick(ticks=10):
+    # The CLI's tick: update_status, then draw_ui into a Screen, one
+    # simulated minute apart, with every entry in the open schedule
+    import clock
+    import perfect_u
+    import xp_log
+    from engine import update_status
+    from store import Document
+
+    os.environ.setdefault("LINES", "60")
+    os.environ.setdefault("COLUMNS", "100")
+    start = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    tasks = make_schedule(SIZES["schedule"], start.date())
+    previous = clock.CLOCK
+    with workdir():
+        schedule = Document("schedule.json", [], journal=True, item_type=Task)
+        schedule.data = tasks
+        index = ScheduleIndex(tasks)
+        queue = ConfirmQueue()
+        profile = make_profile()
+        log = xp_log.LogFile()
+        screen = Screen(out=io.StringIO())
+        sim_clock = clock.ManualClock(start)
+        clock.use_clock(sim_clock)
+        try:
+            status = draw = 0
+            for i in range(ticks):
+                sim_clock.set(start + timedelta(minutes=i))
+                began = time.perf_counter()
+                update_status(profile, schedule, queue, sim_clock.now())
+                status += time.perf_counter() - began
+                began = time.perf_counter()
+                perfect_u.draw_ui(profile, schedule, index, queue, log, screen)
+                draw += time.perf_counter() - began
+        finally:
+            clock.use_clock(previous)
+    return {
+        "entries": len(tasks),
+        "update_status_ms": status / ticks * 1000,
+        "draw_ui_ms": draw / ticks * 1000,
+        "tick_ms": (status + draw) / ticks * 1000
+    }
+
+
+class HeadlessWidget:
+    # Stands in for every Tk widget when there is no display: it accepts
+    # any call and keeps options and list rows, so what is timed is XPApp's
+    # own work without the Tk calls
+
+    def __init__(self, *args, **options):
+        self.options = dict(options)
+        self.rows = []
+        self.tk = self
+
+    def config(self, **options):
+        self.options.update(options)
+
+    configure = config
+
+    def cget(self, key):
+        return self.options.get(key, "")
+
+    def insert(self, i, text):
+        self.rows.insert(len(self.rows) if i == "end" else i, text)
+
+    def delete(self, first, last=None):
+        stop = len(self.rows) if last == "end" else (last or first) + 1
+        del self.rows[first:stop]
+
+    def after(self, delay, func=None):
+        return "after"
+
+    def get(self):
+        return ""
+
+    def curselection(self):
+        return ()
+
+    def __getattr__(self, name):
+        return lambda *args, **options: None
+
+
+HEADLESS_TK = types.SimpleNamespace(
+    Frame=HeadlessWidget, Label=HeadlessWidget, Button=HeadlessWidget,
+    Listbox=HeadlessWidget, Scrollbar=HeadlessWidget, Toplevel=HeadlessWidget,
+    Text=HeadlessWidget, Entry=HeadlessWidget,
+    LEFT="left", RIGHT="right", Y="y", END="end", READABLE=2)
+
+
+@contextmanager
+def display():
+    # (tk module, root): real Tk on $DISPLAY or a private Xvfb, otherwise
+    # the stand-in
+    import Widget
+
+    server = None
+    if not os.environ.get("DISPLAY") and shutil.which("Xvfb"):
+        server = subprocess.Popen(["Xvfb", ":97", "-nolisten", "tcp"],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        os.environ["DISPLAY"] = ":97"
+        time.sleep(0.5)
+    try:
+        try:
+            root = Widget.tk.Tk() if os.environ.get("DISPLAY") else None
+        except Widget.tk.TclError:
+            root = None
+        if root is not None:
+            yield Widget.tk, root
+            root.destroy()
+        else:
+            real = Widget.tk
+            Widget.tk = HEADLESS_TK
+            try:
+                yield HEADLESS_TK, HeadlessWidget()
+            finally:
+                Widget.tk = real
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+            del os.environ["DISPLAY"]
+
+
+def bench_widget(updates=50):
+    # XPApp.update_ui (and one full refresh) with today's partition holding
+    # every schedule entry
+    import Widget
+    from store import save_json
+
+    now = datetime.now()
+    tasks = make_schedule(SIZES["schedule"], now.date())
+    with workdir(), display() as (tk, root):
+        os.makedirs("schedule")
+        save_json(f"schedule/{now:%Y-%m-%d}.json", [t.to_dict() for t in tasks])
+        began = time.perf_counter()
+        app = Widget.XPApp(root)
+        startup = time.perf_counter() - began
+        index = app.engine.index
+        current, upcoming = index.current(now), index.upcoming(now)
+        update = timed(lambda: app.update_ui(current, upcoming), updates)
+        refresh = timed(app.refresh_loop, 5)
+        app.flush()
+    return {
+        "entries": len(tasks),
+        "real_tk": int(tk is not HEADLESS_TK),
+        "startup_ms": startup * 1000,
+        "update_ui_ms": update,
+        "refresh_ms": refresh
+    }
+
+
+def bench_level(calls=100000):
+    # calculate_level from level 1 to XP in the quadrillions, against the
+    # original loop at a billion XP
+    import progression
+
+    xps = [10 ** k + k for k in range(3, 16)]
+    values = [xps[i % len(xps)] for i in range(calls)]
+    began = time.perf_counter()
+    for xp in values:
+        progression.calculate_level(xp)
+    closed = time.perf_counter() - began
+    loop = timed(lambda: progression.loop_level(10 ** 9), 20)
+    batch = timed(lambda: progression.batch_levels(values))
+    return {
+        "calculate_level_us": closed / calls * 1e6,
+        "loop_level_1e9_us": loop * 1000,
+        "batch_levels_ms": batch,
+        "level_at_1e15": progression.level_for_xp(10 ** 15)
+    }
+
+
+def bench_log():
+    # Viewing a large XP log: the newest page, a page far back, one day
+    # and the last 60 days
+    import xp_log
+
+    with workdir():
+        began = time.perf_counter()
+        days = make_log(xp_log.LOG_PATH, SIZES["log_mb"])
+        generate = time.perf_counter() - began
+        log = xp_log.LogFile()
+        middle = (datetime.now().date() - timedelta(days=days // 2)).isoformat()
+        recent = (datetime.now().date() - timedelta(days=60)).isoformat()
+        return {
+            "log_mb": os.path.getsize(xp_log.LOG_PATH) / 2 ** 20,
+            "generate_s": generate,
+            "tail_first_ms": timed(lambda: log.tail_page(0), 10),
+            "tail_deep_ms": timed(lambda: log.tail_page(500), 3),
+            "read_day_ms": timed(lambda: log.read_day(middle), 10),
+            "read_recent_ms": timed(lambda: log.read_from(recent), 3),
+            "cursor_us": timed(log.cursor, 1000) * 1000
+        }
+
+# -------------- Results --------------
+
+
+def direction(key):
+    # -1 when smaller is better (times, bytes), 1 when bigger is, 0 for
+    # sizes and outcomes that are reported but not judged
+    parts = key.rsplit(".", 1)[-1].split("_")
+    if key.endswith("per_sec"):
+        return 1
+    if set(parts) & {"ms", "us", "s", "bytes", "spawns"} and "generate" not in parts:
+        return -1
+    return 0
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    # Lines for every judged result that got worse by more than tolerance
+    regressions = []
+    for key, value in results.items():
+        old = baseline.get(key)
+        sign = direction(key)
+        if not sign or not old:
+            continue
+        change = (value - old) / old * sign
+        unit = key.rsplit("_", 1)[-1]
+        if change < -tolerance and abs(value - old) >= MIN_DELTA.get(unit, 0):
+            regressions.append(f"REGRESSION {key}: {old:.3f} -> {value:.3f} "
+                               f"({(value - old) / old:+.0%})")
+    return regressions
+
+
+def main():
+    import argparse
+    import platform
+    import progression
+
+    global SIZES
+    parser = argparse.ArgumentParser(description="Time the hot paths on synthetic data.")
+    parser.add_argument("names", nargs="*", metavar="name",
+                        help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--out", default=RESULTS_PATH, help="results file (JSON)")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="a results file to check for regressions against")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+    SIZES = SCALES[args.scale]
+
+    results = {}
+    for name in args.names or list(BENCHMARKS):
+        for key, value in BENCHMARKS[name]().items():
+            results[f"{name}.{key}"] = round(value, 4)
+            print(f"{name}.{key}: {round(value, 3)}")
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump({"scale": args.scale, "python": platform.python_version(),
+                   "numpy": progression.load_numpy() is not None,
+                   "time": datetime.now().isoformat(timespec="seconds"),
+                   "results": results}, f, indent=4)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("scale") != args.scale:
+            print(f"⚠️ The baseline was run at scale {baseline.get('scale')}.")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for line in regressions:
+            print(line)
+        print(f"{len(regressions)} regression(s) against {args.compare}.")
+        sys.exit(1 if regressions else 0)
+
+
+BENCHMARKS = {
+    "render": bench_render,
+    "daemon": bench_daemon,
+    "import": bench_import,
+    "stats": bench_stats,
+    "forecast": bench_forecast,
+    "simulate": bench_simulate,
+    "json": bench_json,
+    "catalog": bench_catalog,
+    "startup": bench_startup,
+    "status": bench_status,
+    "conflicts": bench_conflicts,
+    "tick": bench_tick,
+    "widget": bench_widget,
+    "level": bench_level,
+    "log": bench_log
+}
+
+
+if __name__ == "__main__":
+    main()
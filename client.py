@@ -0,0 +1,157 @@
+import json
+import os
+import socket
+
+import sqlite_store
+from daemon import SOCKET_PATH, encode
+from engine import SETTINGS, open_log
+from schedule_index import ScheduleIndex
+from task import Task
+from ticker import MIDNIGHT, WINDOW, Ticker
+
+# -------------- Remote Engine --------------
+
+
+class RemoteEngine:
+    # A mirror of the daemon's state with the same attributes and methods
+    # as engine.Engine. Mutations are sent as requests; the mirror changes
+    # when the resulting delta is pushed back, so every client sees the
+    # same order of updates. The ticker here only wakes the front-end for
+    # the clock and the day-start prompt; the daemon owns transitions.
+
+    def __init__(self, sock, now):
+        self.sock = sock
+        self.inbox = b""
+        self.profile = {}
+        self.schedule = []
+        self.index = ScheduleIndex()
+        self.positions = []
+        self.queue = []
+        self.reply = None
+        self.ticker = Ticker()
+        # The log is read directly; only writes go through the daemon
+        self.db = sqlite_store.connect()
+        self.log = open_log(self.db)
+        self.send({"op": "subscribe"})
+        self.sock.setblocking(True)
+        while not self.profile:
+            self.poll()
+        self.sock.setblocking(False)
+        self.ticker.rebuild(self.profile, self.index, now)
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def send(self, message):
+        self.sock.setblocking(True)
+        try:
+            self.sock.sendall(encode(message))
+        finally:
+            self.sock.setblocking(False)
+
+    def request(self, message):
+        # Sends and waits for the reply, applying deltas that arrive first
+        self.reply = None
+        self.send(message)
+        self.sock.setblocking(True)
+        try:
+            while self.reply is None:
+                self.poll()
+        finally:
+            self.sock.setblocking(False)
+        return self.reply
+
+    def poll(self):
+        # Applies whatever has arrived; True when the mirror changed
+        try:
+            data = self.sock.recv(65536)
+        except BlockingIOError:
+            return False
+        if not data:
+            raise ConnectionError("The engine daemon closed the connection.")
+        self.inbox += data
+        *lines, self.inbox = self.inbox.split(b"\n")
+        for line in lines:
+            self.apply(json.loads(line))
+        return bool(lines)
+
+    def apply(self, message):
+        if message["type"] == "reply":
+            self.reply = message
+            return
+        if message["type"] == "error":
+            # Only a race with another client gets here (the local index is
+            # checked first); the next delta shows the real schedule
+            return
+        if message["type"] == "snapshot":
+            self.profile = message["profile"]
+            self.schedule = [Task.from_dict(t) for t in message["schedule"]]
+        else:
+            self.profile.update(message.get("profile", {}))
+            if "length" in message:
+                del self.schedule[message["length"]:]
+                for i, data in sorted((int(i), t) for i, t in message["tasks"].items()):
+                    if i < len(self.schedule):
+                        self.schedule[i] = Task.from_dict(data)
+                    else:
+                        self.schedule.append(Task.from_dict(data))
+        if "length" in message or message["type"] == "snapshot":
+            self.index = ScheduleIndex(self.schedule)
+        self.positions = message.get("queue", self.positions)
+        self.queue = [self.schedule[i] for i in self.positions]
+
+    def tick(self, now):
+        pass  # the daemon advances and saves the state
+
+    def flush(self):
+        pass
+
+    def wake(self, now):
+        kinds = self.ticker.due(now)
+        if MIDNIGHT in kinds or WINDOW in kinds:
+            self.ticker.rebuild(self.profile, self.index, now)
+        return kinds
+
+    def add(self, task, now):
+        if self.index.overlapping(task.start, task.end):
+            return False
+        self.send({"op": "add", "task": task.to_dict()})
+        return True
+
+    def resolve(self, outcomes, now):
+        # A pushed delta replaces the Task objects a confirm dialog may
+        # still hold, so tasks go by (start, name), unique as tasks never
+        # overlap. Ones no longer in the mirror were settled elsewhere.
+        mirrored = {(t.start, t.name) for t in self.schedule}
+        self.send({"op": "resolve",
+                   "outcomes": [[t.start, t.name, done] for t, done in outcomes.items()
+                                if (t.start, t.name) in mirrored]})
+
+    def import_templates(self, rows, now):
+        reply = self.request({"op": "templates", "rows": list(rows)})
+        return reply["added"], reply["errors"]
+
+    def update_profile(self, fields, now):
+        # Applied locally too, so this client's next check already sees it
+        fields = {k: v for k, v in fields.items() if k in SETTINGS}
+        self.profile.update(fields)
+        self.send({"op": "profile", "fields": fields})
+
+    def start_day(self, started, now):
+        # The daemon applies the answer; its delta may come after the reply
+        reply = self.request({"op": "start_day", "started": started})
+        self.profile.update(reply["profile"])
+        return reply["late"]
+
+
+def connect(now, path=SOCKET_PATH):
+    # A RemoteEngine when a daemon is listening, otherwise None
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return RemoteEngine(sock, now)
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+# -------------- Clocks --------------
+
+
+class SystemClock:
+    def now(self):
+        return datetime.now()
+
+
+class ManualClock:
+    # Time only moves when told to; simulate.py drives the engine with one
+
+    def __init__(self, start):
+        self.current = start
+
+    def now(self):
+        return self.current
+
+    def set(self, when):
+        self.current = when
+
+    def advance(self, delta):
+        self.current += delta
+
+
+# What now() reads; replaced with use_clock
+CLOCK = SystemClock()
+
+
+def use_clock(clock):
+    global CLOCK
+    CLOCK = clock
+
+
+def now():
+    return CLOCK.now()
@@ -0,0 +1,79 @@
+from datetime import date
+
+import progression
+import xp_log
+from task import ACTIVE, DONE, MISSED, PENDING, from_minutes, to_minutes
+
+# -------------- Confirmation Queue --------------
+
+
+class ConfirmQueue:
+    # Finished tasks waiting for the user to say whether they were done.
+    # The tick only moves tasks along and queues them; nothing here prompts,
+    # so a long backlog never stalls redraws or saves.
+
+    def __init__(self):
+        self.tasks = []
+        self.queued = set()
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __iter__(self):
+        return iter(self.tasks)
+
+    def advance(self, schedule, now):
+        now_min = to_minutes(now)
+        for i, task in enumerate(schedule):
+            if task.status not in (PENDING, ACTIVE):
+                continue
+            if now_min >= task.end:
+                if task not in self.queued:
+                    self.queued.add(task)
+                    self.tasks.append(task)
+            elif task.status == PENDING and task.start <= now_min:
+                schedule.update(i, status=ACTIVE)
+
+    def resolve(self, profile, schedule, outcomes, now, log=None):
+        # outcomes maps queued tasks to True (done) or False (missed); log
+        # is an xp_log.LogFile or sqlite_store.SqliteLog.
+        # Returns the XP (earned, lost) by this batch.
+        earned = lost = 0
+        entries = []
+        for task, done in outcomes.items():
+            if task not in self.queued:
+                continue
+            if done:
+                schedule.update(schedule.position(task), status=DONE)
+                profile["xp"] += task.xp
+                earned += task.xp
+                entries.append(xp_log.make_entry(now, task.name, "done", task.xp,
+                                                 from_minutes(task.start)))
+                add_daily_xp(profile, task.day, task.xp)
+            else:
+                schedule.update(schedule.position(task), status=MISSED)
+                penalty = task.xp // 2
+                profile["xp"] = max(0, profile["xp"] - penalty)
+                lost += penalty
+                entries.append(xp_log.make_entry(
+                    now, task.name, "missed", -penalty, from_minutes(task.start)))
+            self.queued.discard(task)
+        self.tasks = [t for t in self.tasks if t in self.queued]
+        (log or xp_log.LogFile()).append(entries)
+        return earned, lost
+
+
+def add_daily_xp(profile, day, xp):
+    # profile["xp_history"] is the XP earned on each of the last
+    # HISTORY_DAYS days, the last of them profile["history_day"]; XP is
+    # added to its task's day, and a later day shifts the window
+    history = profile["xp_history"]
+    last = profile.get("history_day")
+    if last is None or day > last:
+        gap = (date.fromisoformat(day) - date.fromisoformat(last)).days if last else 1
+        history += [0] * min(gap, progression.HISTORY_DAYS)
+        del history[:-progression.HISTORY_DAYS]
+        profile["history_day"] = last = day
+    back = (date.fromisoformat(last) - date.fromisoformat(day)).days
+    if back < len(history):
+        history[-1 - back] += xp
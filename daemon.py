@@ -0,0 +1,264 @@
+import json
+import os
+import selectors
+import signal
+import socket
+import sys
+
+import clock
+from engine import SETTINGS, Engine
+from task import Task
+
+SOCKET_PATH = "perfect_u.sock"
+MAX_BACKLOG = 1 << 20  # bytes queued for a subscriber before it is dropped
+
+DEFAULT_PROFILE = {
+    "username": "You", "xp": 0, "love_xp": 0,
+    "level": 1, "xp_history": [0] * 7,
+    "last_active": clock.now().strftime("%Y-%m-%d"),
+    "earned_xp_display": 0, "lost_xp_display": 0
+}
+
+# -------------- Protocol --------------
+#
+# Newline-delimited JSON both ways. Clients send
+#   {"op": "subscribe"}
+#   {"op": "add", "task": {...}}
+#   {"op": "resolve", "outcomes": [[start minute, name, done], ...]}
+#   {"op": "profile", "fields": {...}}     only engine.SETTINGS fields
+#   {"op": "start_day", "started": bool}
+#   {"op": "templates", "rows": [[number, {...}], ...]}
+# and subscribers get one {"type": "snapshot", ...} followed by
+# {"type": "delta", ...} messages holding only what changed. Requests that
+# return something are answered with {"type": "reply", ...}.
+
+
+def encode(message):
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode('utf-8')
+
+
+def state_of(engine):
+    # What subscribers mirror, as plain JSON values
+    return {
+        "profile": json.loads(json.dumps(engine.profile)),
+        "schedule": [t.to_dict() for t in engine.schedule],
+        "queue": [engine.schedule.position(t) for t in engine.queue]
+    }
+
+
+def diff(old, new):
+    delta = {}
+    profile = {k: v for k, v in new["profile"].items()
+               if old["profile"].get(k) != v}
+    if profile:
+        delta["profile"] = profile
+    tasks = {i: t for i, t in enumerate(new["schedule"])
+             if i >= len(old["schedule"]) or old["schedule"][i] != t}
+    if tasks or len(new["schedule"]) != len(old["schedule"]):
+        delta["tasks"] = tasks
+        delta["length"] = len(new["schedule"])
+    if new["queue"] != old["queue"]:
+        delta["queue"] = new["queue"]
+    return delta
+
+
+def listen(path):
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.remove(path)  # left behind by a daemon that died
+        else:
+            raise RuntimeError(f"A daemon is already listening on {path}.")
+        finally:
+            probe.close()
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(128)
+    server.setblocking(False)
+    return server
+
+# -------------- Daemon --------------
+
+
+class Connection:
+    def __init__(self, sock):
+        self.sock = sock
+        self.inbox = b""
+        self.outbox = b""
+        self.events = selectors.EVENT_READ
+        self.subscribed = False
+
+
+class Daemon:
+    # One engine, any number of clients. The loop sleeps until a ticker
+    # transition or a client message, applies it, then diffs the state
+    # against the last broadcast and sends the same encoded delta to every
+    # subscriber. Sockets are non-blocking; a subscriber that stops reading
+    # is dropped once MAX_BACKLOG bytes are queued for it.
+
+    def __init__(self, engine, path=SOCKET_PATH):
+        self.engine = engine
+        self.path = path
+        self.server = listen(path)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.server, selectors.EVENT_READ)
+        self.connections = {}
+        self.engine.tick(clock.now())
+        self.state = state_of(engine)
+
+    def serve(self):
+        try:
+            while True:
+                self.step(self.engine.ticker.delay(clock.now()))
+        finally:
+            self.close()
+
+    def step(self, timeout):
+        for key, mask in self.selector.select(timeout):
+            if key.fileobj is self.server:
+                self.accept()
+                continue
+            if mask & selectors.EVENT_READ:
+                self.receive(key.data)
+            if mask & selectors.EVENT_WRITE and key.data.sock in self.connections:
+                self.send(key.data)
+        now = clock.now()
+        self.engine.wake(now)
+        self.engine.tick(now)
+        self.broadcast()
+
+    def close(self):
+        self.engine.flush()
+        for conn in list(self.connections.values()):
+            self.drop(conn)
+        self.selector.close()
+        self.server.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def accept(self):
+        try:
+            sock, _ = self.server.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        conn = Connection(sock)
+        self.connections[sock] = conn
+        self.selector.register(sock, conn.events, conn)
+
+    def drop(self, conn):
+        self.selector.unregister(conn.sock)
+        del self.connections[conn.sock]
+        conn.sock.close()
+
+    def receive(self, conn):
+        try:
+            data = conn.sock.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.drop(conn)
+            return
+        conn.inbox += data
+        *lines, conn.inbox = conn.inbox.split(b"\n")
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                self.handle(conn, json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                self.push(conn, {"type": "error", "message": f"Bad request: {e}"})
+            if conn.sock not in self.connections:
+                return
+
+    def handle(self, conn, message):
+        op = message["op"]
+        now = clock.now()
+        if op == "subscribe":
+            # The last broadcast state: the next delta is diffed against it
+            conn.subscribed = True
+            self.push(conn, {"type": "snapshot", **self.state})
+        elif op == "add":
+            if not self.engine.add(Task.from_dict(message["task"]), now):
+                self.push(conn, {"type": "error",
+                                 "message": "The slot overlaps another task."})
+        elif op == "resolve":
+            tasks = {(t.start, t.name): t for t in self.engine.schedule}
+            self.engine.resolve({tasks[start, name]: bool(done)
+                                 for start, name, done in message["outcomes"]
+                                 if (start, name) in tasks}, now)
+        elif op == "profile":
+            self.engine.update_profile({k: v for k, v in message["fields"].items()
+                                        if k in SETTINGS}, now)
+        elif op == "start_day":
+            # Applied here, to the profile other clients change too
+            late = self.engine.start_day(bool(message["started"]), now)
+            profile = self.engine.profile
+            self.push(conn, {"type": "reply", "late": late, "profile": {
+                k: profile[k] for k in ("xp", "day_started", "can_schedule")}})
+        elif op == "templates":
+            added, errors = self.engine.import_templates(message["rows"], now)
+            self.push(conn, {"type": "reply", "added": added, "errors": errors})
+        else:
+            self.push(conn, {"type": "error", "message": f"Unknown op: {op}"})
+
+    def push(self, conn, message):
+        conn.outbox += encode(message)
+        self.send(conn)
+
+    def send(self, conn):
+        try:
+            sent = conn.sock.send(conn.outbox)
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            self.drop(conn)
+            return
+        conn.outbox = conn.outbox[sent:]
+        if len(conn.outbox) > MAX_BACKLOG:
+            self.drop(conn)
+            return
+        events = selectors.EVENT_READ
+        if conn.outbox:
+            events |= selectors.EVENT_WRITE
+        if events != conn.events:
+            self.selector.modify(conn.sock, events, conn)
+            conn.events = events
+
+    def broadcast(self):
+        state = state_of(self.engine)
+        delta = diff(self.state, state)
+        self.state = state
+        if not delta:
+            return
+        data = encode({"type": "delta", **delta})
+        for conn in list(self.connections.values()):
+            if conn.subscribed:
+                conn.outbox += data
+                self.send(conn)
+
+
+def main():
+    if not hasattr(socket, "AF_UNIX"):
+        print("❌ Unix sockets are not available on this platform.")
+        return
+    try:
+        daemon = Daemon(Engine(DEFAULT_PROFILE, clock_minutes=False))
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return
+    print(f"🔌 Serving on {SOCKET_PATH} (Ctrl+C to stop)")
+    # serve() saves and removes the socket on the way out
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    try:
+        daemon.serve()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
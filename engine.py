@@ -0,0 +1,200 @@
+from datetime import datetime
+
+import clock
+import metrics
+import progression
+import recurring
+import sqlite_store
+import store
+import xp_log
+from confirm import ConfirmQueue, add_daily_xp
+from progression import calculate_level
+from schedule_index import ScheduleIndex
+from schedule_store import ScheduleStore, read_history as read_archive
+from store import Document
+from task import to_minutes
+from ticker import MIDNIGHT, WINDOW, Ticker
+
+PROFILE_PATH = "profile.json"
+SCHEDULE_PATH = "schedule.json"
+TASKS_PATH = recurring.TASKS_PATH
+TEMPLATES_PATH = recurring.TEMPLATES_PATH
+LOG_PATH = xp_log.LOG_PATH
+# Profile fields a front-end may set; XP and the day's state only change
+# through the engine's own rules (start_day, resolve, decay)
+SETTINGS = ("username", "start_hour")
+
+# -------------- Profile Rules --------------
+
+
+def apply_decay(profile, now=None):
+    last = datetime.strptime(profile["last_active"], "%Y-%m-%d")
+    metrics.count("datetime_parses")
+    today = (now or clock.now()).date()
+    days = (today - last.date()).days
+    if days > 0:
+        profile["xp"] = progression.decay(profile["xp"], days)
+        profile["love_xp"] = progression.decay(
+            profile["love_xp"], days, progression.LOVE_DECAY)
+        profile["last_active"] = today.strftime("%Y-%m-%d")
+        # Days without confirmations count as 0 XP in the daily average
+        add_daily_xp(profile, profile["last_active"], 0)
+    return profile
+
+
+def begin_day(profile, now, started):
+    # The day can be started until an hour after start_hour; `started` is
+    # the user's answer inside that window. After it the day starts late:
+    # 10% XP off and nothing can be scheduled. True when that happened.
+    today = now.strftime("%Y-%m-%d")
+    if profile.get("day_started") == today:
+        profile["can_schedule"] = True
+        return False
+    if now.hour < profile["start_hour"] + 1:
+        if started:
+            profile["day_started"] = today
+        profile["can_schedule"] = bool(started)
+        return False
+    profile["xp"] = progression.decay(profile["xp"], 1)
+    profile["can_schedule"] = False
+    profile["day_started"] = today
+    return True
+
+
+def in_window(profile, now):
+    return profile.get("day_started") != now.strftime("%Y-%m-%d") \
+        and now.hour < profile["start_hour"] + 1
+
+
+def update_status(profile, schedule, queue, now):
+    # Starts due tasks and queues finished ones; resolve() settles them
+    queue.advance(schedule, now)
+    profile["level"], _ = calculate_level(profile["xp"])
+    profile.setdefault("earned_xp_display", 0)
+    profile.setdefault("lost_xp_display", 0)
+    return profile, schedule
+
+
+def open_log(db, profile_path=PROFILE_PATH, log_path=LOG_PATH):
+    # `db` is the open perfect_u.db (Engine.db), or None for the JSON files
+    return sqlite_store.SqliteLog(db, profile_path) if db else xp_log.LogFile(log_path)
+
+
+def read_history(db, now, start=None, end=None, profile_path=PROFILE_PATH):
+    # Past days as (day, tasks), oldest first. Like the log it is read
+    # straight from storage (`db` as in open_log), so the front-ends can
+    # show it with a daemon running too.
+    if db is None:
+        return read_archive(start, end)
+    return sqlite_store.read_history(db, profile_path, now, start, end)
+
+# -------------- Engine --------------
+
+
+class Engine:
+    # Owns the profile, schedule, index, ticker and confirmation queue and
+    # applies every state change. The front-ends drive one directly when
+    # they run alone; with a daemon (daemon.py) there is exactly one, and
+    # they talk to it through client.RemoteEngine, which has the same
+    # attributes and methods.
+
+    def __init__(self, profile_default, now=None, clock_minutes=True,
+                 profile_path=PROFILE_PATH, schedule_path=SCHEDULE_PATH,
+                 log_path=LOG_PATH, tasks_path=TASKS_PATH,
+                 templates_path=TEMPLATES_PATH, db=None):
+        now = now or clock.now()
+        # Kept open for the log and history reads, so each view reuses
+        # its connections instead of opening the file again
+        self.db = db = db or sqlite_store.connect()
+        if db:
+            # Created by `python sqlite_store.py migrate`, or in memory
+            # for simulate.py
+            store.use_backend(sqlite_store.SqliteBackend(db))
+            self.schedule = sqlite_store.SqliteSchedule(db, profile_path, now)
+        else:
+            xp_log.migrate(xp_log.LEGACY_PATH, log_path)
+            # Only today's partition (and unfinished past days) is loaded
+            self.schedule = ScheduleStore(now, legacy_path=schedule_path)
+        self.log = open_log(db, profile_path, log_path)
+        self.profile_doc = Document(profile_path, profile_default)
+        self.profile = apply_decay(self.profile_doc.data, now)
+        self.tasks_path = tasks_path
+        self.templates_doc = Document(templates_path, [])
+        self.templates = recurring.load(
+            self.templates_doc.data, recurring.load_catalog(tasks_path))
+        self.index = ScheduleIndex(self.schedule)
+        self.queue = ConfirmQueue()
+        self.ticker = Ticker(clock_minutes)
+        self.ticker.rebuild(self.profile, self.index, now)
+        self.materialize(self.templates, now)
+
+    def tick(self, now):
+        with metrics.timed("tick"):
+            update_status(self.profile, self.schedule, self.queue, now)
+            self.flush()
+        metrics.gauge("pending_prompts", len(self.queue))
+        metrics.flush_due()
+
+    def flush(self):
+        self.profile_doc.flush()
+        self.templates_doc.flush()
+        self.schedule.flush()
+
+    def wake(self, now):
+        # Pops due transitions; returns their kinds (empty on a clock tick)
+        kinds = self.ticker.due(now)
+        if MIDNIGHT in kinds:
+            apply_decay(self.profile, now)
+            self.schedule.rollover(now)
+            self.index = ScheduleIndex(self.schedule)
+        if MIDNIGHT in kinds or WINDOW in kinds:
+            self.ticker.rebuild(self.profile, self.index, now)
+        if MIDNIGHT in kinds:
+            self.materialize(self.templates, now)
+        return kinds
+
+    def materialize(self, templates, now):
+        # Today's occurrences that have not started yet join the schedule;
+        # ones already there (or clashing with a task) are skipped
+        now_min = to_minutes(now)
+        for task in recurring.expand(templates, now.date(), now.date()):
+            if task.start >= now_min:
+                self.add(task, now)
+
+    def import_templates(self, rows, now):
+        # rows are (number, template dict) pairs, e.g. from recurring.read_file.
+        # Returns (templates added, error messages).
+        accepted, errors = recurring.validate(
+            rows, self.templates, self.index,
+            recurring.load_catalog(self.tasks_path), now)
+        self.templates += accepted
+        self.templates_doc.data.extend(t.to_dict() for t in accepted)
+        self.materialize(accepted, now)
+        return len(accepted), errors
+
+    def add(self, task, now):
+        # False when the slot is taken
+        if self.index.overlapping(task.start, task.end):
+            return False
+        self.schedule.append(task)
+        self.index.add(task)
+        self.ticker.track(task, now)
+        return True
+
+    def resolve(self, outcomes, now):
+        earned, lost = self.queue.resolve(
+            self.profile, self.schedule, outcomes, now, self.log)
+        self.profile["earned_xp_display"] = earned
+        self.profile["lost_xp_display"] = lost
+        update_status(self.profile, self.schedule, self.queue, now)
+        return earned, lost
+
+    def update_profile(self, fields, now):
+        self.profile.update(fields)
+        self.ticker.rebuild(self.profile, self.index, now)
+
+    def start_day(self, started, now):
+        # begin_day on the live profile; True when the late penalty applied
+        late = begin_day(self.profile, now, started)
+        self.ticker.rebuild(self.profile, self.index, now)
+        return late
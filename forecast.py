@@ -0,0 +1,163 @@
+import random
+from datetime import date, timedelta
+
+from progression import DECAY, level_for_xp, level_threshold, load_numpy
+from xp_log import entry_start
+
+TRAJECTORIES = 100000
+LIST_TRAJECTORIES = 2000  # without NumPy
+SAMPLE_DAYS = 60          # the empirical distribution covers this many days
+HORIZON_DAYS = 365
+SIMULATED_DAYS = 90       # walked day by day; the rest is extrapolated
+HAZARD_DAYS = 30          # from the level-up rate over this many last days
+QUANTILES = (0.5, 0.9)
+
+# The last forecast: (key, result); see level_eta
+CACHE = [None, None]
+
+# -------------- Samples --------------
+
+
+def daily_outcomes(log, today, days=SAMPLE_DAYS):
+    # (XP earned, XP lost) for each day from the first logged one, at most
+    # `days` ago, until yesterday. Idle days are kept as (0, 0): they still
+    # decay. Today only counts while it is the only day there is.
+    first = (today - timedelta(days=days)).isoformat()
+    totals = {}
+    for entry in log.read_from(first):
+        day = entry_start(entry)[:10]
+        if day < first:
+            continue  # confirmed in the window, scheduled before it
+        totals.setdefault(day, [0, 0])[entry["xp"] < 0] += abs(entry["xp"])
+    past = sorted(day for day in totals if day < today.isoformat())
+    if not past:
+        return [tuple(totals[day]) for day in totals]
+    start = date.fromisoformat(past[0])
+    return [tuple(totals.get((start + timedelta(days=d)).isoformat(), (0, 0)))
+            for d in range((today - start).days)]
+
+# -------------- Simulation --------------
+#
+# Each trajectory starts from the current XP and, for every future day,
+# decays it by DECAY (as apply_decay does at the day start), then adds the
+# XP earned and subtracts the penalties of a day drawn from the samples,
+# never going below zero. XP can never pass max(xp, best day / (1 - DECAY)),
+# so a level above that is out of reach without simulating. Only the number of trajectories that reach the
+# next level on each day is kept, so the walk stops as soon as the last
+# quantile is known.
+#
+# By SIMULATED_DAYS the starting XP has decayed away (0.9 ** 90 ~ 1e-4) and
+# the share of the remaining trajectories levelling up each day is steady,
+# so later days are extrapolated from that rate instead of walked.
+
+
+def extrapolate(hits, trajectories, horizon):
+    alive = trajectories - sum(hits)
+    window = hits[-HAZARD_DAYS:]
+    exposed = sum(alive + sum(window[i:]) for i in range(len(window)))
+    hazard = sum(window) / exposed if exposed else 0
+    hits = list(hits)
+    while hazard and len(hits) < horizon:
+        hits.append(alive * hazard)
+        alive -= hits[-1]
+    return hits
+
+
+def quantile_days(hits, trajectories):
+    # {quantile: first day by which that share had levelled up, or None}
+    result = {}
+    reached = 0
+    for day, count in enumerate(hits, 1):
+        reached += count
+        for q in QUANTILES:
+            if q not in result and reached >= q * trajectories:
+                result[q] = day
+    return {q: result.get(q) for q in QUANTILES}
+
+
+def simulate_numpy(np, xp, target, samples, trajectories, horizon, seed):
+    rng = np.random.default_rng(seed)
+    net = np.array([earned - lost for earned, lost in samples], dtype=np.float64)
+    values = np.full(trajectories, float(xp))
+    needed = max(QUANTILES) * trajectories
+    reached = 0
+    hits = []
+    for _ in range(horizon):
+        values *= DECAY
+        np.floor(values, out=values)
+        values += net.take(rng.integers(len(net), size=len(values)))
+        np.maximum(values, 0, out=values)
+        done = values >= target
+        count = int(np.count_nonzero(done))
+        hits.append(count)
+        reached += count
+        if reached >= needed:
+            break
+        if count:
+            values = values[~done]
+    return hits
+
+
+def simulate_lists(xp, target, samples, trajectories, horizon, seed):
+    rng = random.Random(seed)
+    net = [earned - lost for earned, lost in samples]
+    values = [xp] * trajectories
+    needed = max(QUANTILES) * trajectories
+    reached = 0
+    hits = []
+    for _ in range(horizon):
+        values = [max(0, int(v * DECAY) + rng.choice(net)) for v in values]
+        left = [v for v in values if v < target]
+        hits.append(len(values) - len(left))
+        reached += hits[-1]
+        if reached >= needed:
+            break
+        values = left
+    return hits
+
+
+def simulate(xp, samples, trajectories=None, horizon=HORIZON_DAYS, seed=0):
+    # {quantile: days until the next level, or None past the horizon}
+    target = level_threshold(level_for_xp(xp) + 1)
+    best = max(earned - lost for earned, lost in samples)
+    if target > max(xp, best / (1 - DECAY)):
+        return {q: None for q in QUANTILES}
+    np = load_numpy()
+    days = min(horizon, SIMULATED_DAYS)
+    if np is None:
+        trajectories = min(trajectories or LIST_TRAJECTORIES, LIST_TRAJECTORIES)
+        hits = simulate_lists(xp, target, samples, trajectories, days, seed)
+    else:
+        trajectories = trajectories or TRAJECTORIES
+        hits = simulate_numpy(np, xp, target, samples, trajectories, days, seed)
+    if len(hits) == days < horizon:
+        hits = extrapolate(hits, trajectories, horizon)
+    return quantile_days(hits, trajectories)
+
+# -------------- Cache --------------
+
+
+def level_eta(profile, log, today=None):
+    # Forecast for the profile's next level; recomputed only when the XP,
+    # the day or the log changes, so drawing a frame costs one stat. None
+    # when there is no history to sample.
+    today = today or date.today()
+    key = (profile["xp"], today, log.cursor())
+    if CACHE[0] != key:
+        samples = daily_outcomes(log, today)
+        CACHE[:] = key, simulate(profile["xp"], samples) if samples else None
+    return CACHE[1]
+
+
+def format_eta(result):
+    if result is None:
+        return "no history yet"
+    p50, p90 = (result[q] for q in QUANTILES)
+    if p50 is None:
+        return f"over {HORIZON_DAYS} days"
+    if p90 is None:
+        return f"~{p50} days (P90 over {HORIZON_DAYS})"
+    if p50 == p90:
+        return f"{p50} days"
+    return f"{p50}–{p90} days (P50–P90)"
+
@@ -0,0 +1,237 @@
+import cProfile
+import io
+import os
+import pstats
+import signal
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+PROM_PATH = "metrics.prom"
+PROFILE_PATH = "profile_top.txt"
+FLUSH_SECONDS = 15
+TOP_N = 25
+# Upper bounds in seconds, as in a Prometheus histogram
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Recording is a dict update or a perf_counter pair, cheap enough to stay
+# on in every tick. What is recorded:
+#   - tick and render durations, as histograms
+#   - bytes read and written per file
+#   - datetime parses, and other counters
+#   - pending confirmation prompts, and other gauges
+# The front-ends show them with --stats, write them as a Prometheus text
+# file with --metrics and can profile themselves with --profile.
+
+# -------------- Recording --------------
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.last = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.last = seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation (the
+        # maximum for the overflow bucket)
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if count and seen >= rank:
+                return bound
+        return self.max
+
+
+HISTOGRAMS = {"tick": Histogram(), "render": Histogram()}
+COUNTERS = {}
+GAUGES = {}
+# {(path, "read" or "written"): bytes}
+FILE_BYTES = {}
+
+
+def count(name, n=1):
+    COUNTERS[name] = COUNTERS.get(name, 0) + n
+
+
+def gauge(name, value):
+    GAUGES[name] = value
+
+
+def file_bytes(path, direction, n):
+    key = (os.path.basename(path), direction)
+    FILE_BYTES[key] = FILE_BYTES.get(key, 0) + n
+
+
+def observe(name, seconds):
+    HISTOGRAMS[name].observe(seconds)
+
+
+@contextmanager
+def timed(name):
+    began = time.perf_counter()
+    try:
+        yield
+    finally:
+        HISTOGRAMS[name].observe(time.perf_counter() - began)
+
+
+def reset():
+    for name in HISTOGRAMS:
+        HISTOGRAMS[name] = Histogram()
+    COUNTERS.clear()
+    GAUGES.clear()
+    FILE_BYTES.clear()
+
+# -------------- Display --------------
+
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+def overlay_lines():
+    tick, render = HISTOGRAMS["tick"], HISTOGRAMS["render"]
+    read = sum(n for (_, d), n in FILE_BYTES.items() if d == "read")
+    written = sum(n for (_, d), n in FILE_BYTES.items() if d == "written")
+    busiest = sorted(FILE_BYTES.items(), key=lambda item: -item[1])[:3]
+    lines = [
+        f"⏱ Tick: {tick.count} | last {tick.last * 1000:.1f} ms | "
+        f"p50 ≤{tick.quantile(0.5) * 1000:g} p99 ≤{tick.quantile(0.99) * 1000:g} "
+        f"max {tick.max * 1000:.1f} ms",
+        f"🖥 Render: last {render.last * 1000:.1f} ms | max {render.max * 1000:.1f} ms",
+        f"💾 Read {format_bytes(read)} | Written {format_bytes(written)}",
+        f"🗓 Datetime parses: {COUNTERS.get('datetime_parses', 0)} | "
+        f"⏳ Pending prompts: {GAUGES.get('pending_prompts', 0)}",
+    ]
+    if busiest:
+        lines.append("   " + ", ".join(f"{path} {direction} {format_bytes(n)}"
+                                       for (path, direction), n in busiest))
+    if PROFILER[0]:
+        lines.append(f"🔬 Profiling on; SIGUSR1 writes the top functions to {PROFILE_PATH}")
+    return lines
+
+# -------------- Export --------------
+
+
+def write_file(path, text):
+    # Replaced whole so a scraper never reads half a file; store.py counts
+    # its bytes, so this does not go through it
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def prometheus_text():
+    lines = []
+    for name, histogram in HISTOGRAMS.items():
+        metric = f"perfect_u_{name}_seconds"
+        lines += [f"# HELP {metric} Duration of a {name}.", f"# TYPE {metric} histogram"]
+        seen = 0
+        for bound, n in zip(histogram.buckets, histogram.counts):
+            seen += n
+            lines.append(f'{metric}_bucket{{le="{bound}"}} {seen}')
+        lines += [f'{metric}_bucket{{le="+Inf"}} {histogram.count}',
+                  f"{metric}_sum {histogram.sum}", f"{metric}_count {histogram.count}"]
+    lines += ["# HELP perfect_u_file_bytes_total Bytes read and written per file.",
+              "# TYPE perfect_u_file_bytes_total counter"]
+    for (path, direction), n in sorted(FILE_BYTES.items()):
+        lines.append(f'perfect_u_file_bytes_total{{file="{label(path)}",'
+                     f'direction="{direction}"}} {n}')
+    for name, value in sorted(COUNTERS.items()):
+        lines += [f"# TYPE perfect_u_{name}_total counter", f"perfect_u_{name}_total {value}"]
+    for name, value in sorted(GAUGES.items()):
+        lines += [f"# TYPE perfect_u_{name} gauge", f"perfect_u_{name} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+# [path, seconds between writes, monotonic time of the last write]; the
+# path is None until export() is called
+EXPORT = [None, FLUSH_SECONDS, 0.0]
+
+
+def export(path=PROM_PATH, interval=FLUSH_SECONDS):
+    EXPORT[:] = path, interval, 0.0
+
+
+def flush_due():
+    # Called every tick and frame; writes at most once per interval
+    path, interval, last = EXPORT
+    if path and time.monotonic() - last >= interval:
+        write_file(path, prometheus_text())
+        EXPORT[2] = time.monotonic()
+
+# -------------- Profiling --------------
+
+
+# [cProfile.Profile or None, top N]
+PROFILER = [None, TOP_N]
+
+
+def start_profile(top=TOP_N):
+    # Profiles everything from here on; SIGUSR1 writes the top functions
+    # to PROFILE_PATH without interrupting the app
+    profiler = cProfile.Profile()
+    profiler.enable()
+    PROFILER[:] = profiler, top
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda *args: dump_profile())
+
+
+def profile_top(top=None):
+    # The hottest functions by own time, as pstats prints them
+    profiler, default = PROFILER
+    if profiler is None:
+        return ["Profiling is off; start with --profile."]
+    out = io.StringIO()
+    profiler.disable()
+    try:
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats("tottime").print_stats(top or default)
+    finally:
+        profiler.enable()
+    return out.getvalue().strip("\n").splitlines()
+
+
+def dump_profile(path=PROFILE_PATH, top=None):
+    write_file(path, "\n".join(profile_top(top)) + "\n")
+    return path
+
+# -------------- Options --------------
+
+
+def add_arguments(parser):
+    parser.add_argument("--stats", action="store_true",
+                        help="show tick, render and I/O metrics")
+    parser.add_argument("--metrics", nargs="?", const=PROM_PATH, metavar="PATH",
+                        help=f"write Prometheus metrics every {FLUSH_SECONDS} s "
+                             f"(default: {PROM_PATH})")
+    parser.add_argument("--profile", nargs="?", type=int, const=TOP_N, metavar="N",
+                        help="profile with cProfile and dump the top N functions on demand")
+
+
+def apply_arguments(args):
+    if args.metrics:
+        export(args.metrics)
+    if args.profile:
+        start_profile(args.profile)
@@ -1,27 +1,50 @@
-import json
+import argparse
 import os
-import time
-from datetime import datetime, timedelta
+import select
+import sys
+from datetime import timedelta
+
+import client
+import clock
+import metrics
+import progression
+import recurring
+import task_catalog
+import xp_log
+from engine import Engine, in_window, read_history
+from progression import xp_for_level
+from screen import Screen
+from store import save_json
+from task import DONE, Task, format_hhmm, to_minutes
+from ticker import MIDNIGHT, WINDOW
 
 PROFILE_PATH = "profile.json"
 SCHEDULE_PATH = "schedule.json"
 TASKS_PATH = "tasks.json"
-LOG_PATH = "xp_log.txt"
+LOG_PATH = xp_log.LOG_PATH
 
 # -------------- Utility Functions --------------
 
 
-def load_json(path, default):
-    if not os.path.exists(path):
-        with open(path, 'w') as f:
-            json.dump(default, f)
-    with open(path, 'r') as f:
-        return json.load(f)
-
-
-def save_json(path, data):
-    with open(path, 'w') as f:
-        json.dump(data, f, indent=4)
+def wait_for_input(timeout, remote=None, screen=None):
+    # Returns None when the timeout expires (or the daemon pushed an
+    # update, or the terminal was resized) before a line is entered
+    if os.name == "nt" or timeout is None:
+        return input().strip()
+    sources = [sys.stdin] + ([remote] if remote else [])
+    if screen and screen.resize_fd is not None:
+        sources.append(screen.resize_fd)
+    ready, _, _ = select.select(sources, [], [], timeout)
+    if remote in ready:
+        remote.poll()
+    if screen and screen.resize_fd in ready:
+        screen.resized()
+    if sys.stdin not in ready:
+        return None
+    line = sys.stdin.readline()
+    if not line:
+        raise EOFError
+    return line.strip()
 
 
 def draw_bar(current, max_val):
@@ -30,188 +53,148 @@ def draw_bar(current, max_val):
     return '[' + '=' * filled + ' ' * (width - filled) + ']'
 
 
-def xp_for_level(level):
-    return 100 * level + 200
-
+def get_days_to_next_level(profile, log, today):
+    import forecast
 
-def calculate_level(xp):
-    level = 1
-    total = xp_for_level(level)
-    while xp >= total:
-        level += 1
-        total += xp_for_level(level)
-    return level, total - (total - xp_for_level(level))
-
-
-def get_days_to_next_level(profile):
-    xp = profile["xp"]
-    level = profile["level"]
-    xp_needed = xp_for_level(level + 1)
-    avg = sum(profile["xp_history"][-7:]) / max(1, len(profile["xp_history"]))
-    if avg <= 0:
-        return "⚠️ Negative XP trend"
-    return f"{round((xp_needed - xp) / avg, 1)} days"
+    return forecast.format_eta(forecast.level_eta(profile, log, today))
 
 
 def format_task(task):
     if not task:
         return "None"
-    return f"{task['name']} ({task['start'][-5:]})"
+    return f"{task.name} ({format_hhmm(task.start)})"
 
 # -------------- Profile Management --------------
 
 
-def apply_decay(profile):
-    last = datetime.strptime(profile["last_active"], "%Y-%m-%d")
-    today = datetime.now().date()
-    days = (today - last.date()).days
-    if days > 0:
-        profile["xp"] = int(profile["xp"] * (0.9 ** days))
-        profile["love_xp"] = int(profile["love_xp"] * (0.95 ** days))
-        profile["last_active"] = today.strftime("%Y-%m-%d")
-    return profile
-
-
-def check_day_start(profile):
-    now = datetime.now()
-    today_str = now.strftime("%Y-%m-%d")
-    hour = now.hour
-
-    if "start_hour" not in profile:
-        profile["start_hour"] = int(
-            input("🕒 What hour do you want to start your day every day? (0–23): "))
-
-    if profile.get("day_started") == today_str:
-        profile["can_schedule"] = True
-        return profile
-
-    if hour < profile["start_hour"] + 1:
-        choice = input("☀️ Start your day? (y/n): ").strip().lower()
-        if choice == "y":
-            profile["day_started"] = today_str
-            profile["can_schedule"] = True
-        else:
-            profile["can_schedule"] = False
-    else:
+def start_day(engine, ask=True):
+    # With ask=False (at midnight, when nobody may be there to answer) the
+    # day is settled without a prompt; main offers it on the next input
+    if "start_hour" not in engine.profile:
+        engine.update_profile({"start_hour": int(
+            input("🕒 What hour do you want to start your day every day? (0–23): "))},
+            clock.now())
+
+    started = False
+    if ask and in_window(engine.profile, clock.now()):
+        started = input("☀️ Start your day? (y/n): ").strip().lower() == "y"
+    # The engine (or the daemon) applies the answer to the live profile,
+    # at the time it arrives, which can be after the window
+    if engine.start_day(started, clock.now()):
         print("⏰ You missed your scheduling window. -10% XP penalty applied.")
-        profile["xp"] = int(profile["xp"] * 0.9)
-        profile["can_schedule"] = False
-        profile["day_started"] = today_str
-    return profile
 
 # -------------- Task Functions --------------
 
 
-def add_tasks(profile, schedule):
-    if not profile.get("can_schedule"):
+def add_tasks(engine):
+    if not engine.profile.get("can_schedule"):
         print("\n🚫 You cannot schedule tasks today.")
         input("Press Enter to continue...")
         return
 
-    tasks_data = load_json(TASKS_PATH, {"tasks": []})["tasks"]
-    print("\n📋 Available Tasks:")
-    for i, task in enumerate(tasks_data):
-        print(f"[{i+1}] {task['name']} – {task['duration']}min, {task['xp']} XP")
-
-    print("\n🕓 Format: task_number; start_hour[,hour2,...]")
-    print("Example: 1; 09,10,11")
+    catalog = task_catalog.load(TASKS_PATH)
+    query = ""
+    results = catalog.search(query)
+    page = 0
+    show_page = True
 
     while True:
+        if show_page:
+            # Only one page of the (filtered) catalog is printed at a time;
+            # task numbers count through the filtered list
+            rows, page, pages = task_catalog.page_of(results, page)
+            title = f"matching '{query}'" if query else "Available Tasks"
+            print(f"\n📋 {title} ({len(results)}, page {page + 1}/{pages}):")
+            for number, task in rows:
+                print(f"[{number}] {task_catalog.format_task(task)}")
+            print("\n🔎 /text search  [n] Next page  [p] Previous page  (/ alone clears)")
+            print("🕓 Format: task_number; start_hour[,hour2,...]   Example: 1; 09,10,11")
+            print("🔁 Recurring: r name days times   e.g. r Gym Mon/Wed/Fri 07:00")
+            print("📥 Import: i file.csv / file.ics")
+            show_page = False
+
         entry = input("Add tasks (or leave empty to exit): ").strip()
         if not entry:
             break
+        if entry.startswith("/"):
+            query = entry[1:]
+            results = catalog.search(query)
+            page = 0
+            show_page = True
+            continue
+        if entry.lower() in ("n", "p"):
+            page += 1 if entry.lower() == "n" else -1
+            show_page = True
+            continue
         try:
+            if entry[:2].lower() in ("r ", "i "):
+                add_templates(engine, entry[0].lower(), entry[2:].strip())
+                continue
             num, times_str = entry.split(";")
-            task = tasks_data[int(num.strip()) - 1]
+            number = int(num.strip())
+            if not 1 <= number <= len(results):
+                raise ValueError(f"no task number {number}")
+            task = results[number - 1]
             times = [int(t.strip()) for t in times_str.split(",")]
             for hour in times:
-                start = datetime.now().replace(hour=hour, minute=0, second=0, microsecond=0)
-                end = start + timedelta(minutes=task["duration"])
-
-                conflict = False
-                for s in schedule:
-                    s_start = datetime.strptime(s["start"], "%Y-%m-%d %H:%M")
-                    s_end = s_start + timedelta(minutes=s["duration"])
-                    if s_start < end and start < s_end:
-                        conflict = True
-                        break
-                if conflict:
+                start = clock.now().replace(hour=hour, minute=0, second=0, microsecond=0)
+                entry = Task(task["name"], to_minutes(start),
+                             task["duration"], task["xp"])
+
+                if not engine.add(entry, clock.now()):
                     print(
                         f"⚠️ Conflict: '{task['name']}' at {hour:02d}:00 overlaps.")
-                    continue
-
-                schedule.append({
-                    "name": task["name"],
-                    "start": start.strftime("%Y-%m-%d %H:%M"),
-                    "duration": task["duration"],
-                    "xp": task["xp"],
-                    "status": "⏳"
-                })
         except Exception as e:
             print(f"❌ Error: {e}")
-    save_json(SCHEDULE_PATH, schedule)
 
 
-def update_status(profile, schedule):
-    now = datetime.now()
-    earned, lost = 0, 0
-    lines = []
+def add_templates(engine, kind, text):
+    if kind == "r":
+        rows = [(1, recurring.parse_spec(text))]
+    else:
+        rows = recurring.read_file(text)
+    added, errors = engine.import_templates(rows, clock.now())
+    for error in errors[:10]:
+        print(f"⚠️ {error}")
+    if len(errors) > 10:
+        print(f"⚠️ ...and {len(errors) - 10} more.")
+    print(f"🔁 Added {added} recurring task(s).")
+
+
+def confirm_tasks(engine):
+    tasks = list(engine.queue)
+    choices = {}
+    while True:
+        os.system("cls" if os.name == "nt" else "clear")
+        print("⏳ Finished tasks awaiting confirmation:\n")
+        for n, task in enumerate(tasks, 1):
+            mark = {True: "✓", False: "X"}.get(choices.get(task), "?")
+            print(f"[{n}] [{mark}] {task.name:<12} ended {format_hhmm(task.end)}  +{task.xp} / -{task.xp // 2} XP")
+        print("\n[a] All done  [m] All missed  [1,2,...] Toggle  [Enter] Apply")
+        entry = input("> ").strip().lower()
+        if not entry:
+            break
+        if entry == "a":
+            choices = {task: True for task in tasks}
+        elif entry == "m":
+            choices = {task: False for task in tasks}
+        else:
+            try:
+                for num in entry.split(","):
+                    task = tasks[int(num.strip()) - 1]
+                    choices[task] = not choices.get(task, False)
+            except (ValueError, IndexError):
+                pass
 
-    for task in schedule:
-        start = datetime.strptime(task["start"], "%Y-%m-%d %H:%M")
-        end = start + timedelta(minutes=task["duration"])
-
-        if task["status"] == "⏳":
-            if start <= now < end:
-                task["status"] = "🕒"
-            elif now >= end:
-                print(
-                    f"\n⏳ Task '{task['name']}' ended at {end.strftime('%H:%M')}")
-                result = input("Did you complete it? (y/n): ").strip().lower()
-                if result == "y":
-                    task["status"] = "✓"
-                    profile["xp"] += task["xp"]
-                    earned += task["xp"]
-                    lines.append(
-                        f"{now.strftime('%Y-%m-%d %H:%M')} - ✅ {task['name']} (+{task['xp']} XP)")
-                else:
-                    task["status"] = "X"
-                    penalty = int(task["xp"] / 2)
-                    profile["xp"] = max(0, profile["xp"] - penalty)
-                    lost += penalty
-                    lines.append(
-                        f"{now.strftime('%Y-%m-%d %H:%M')} - ❌ {task['name']} (-{penalty} XP)")
-
-    if lines:
-        with open(LOG_PATH, "a") as f:
-            f.write(f"\n=== {now.strftime('%Y-%m-%d')} ===\n")
-            for l in lines:
-                f.write(l + "\n")
-
-    profile["xp_history"].append(earned)
-    if len(profile["xp_history"]) > 7:
-        profile["xp_history"] = profile["xp_history"][-7:]
-    profile["earned_xp_display"] = earned
-    profile["lost_xp_display"] = lost
-
-    return profile, schedule
+    if choices:
+        engine.resolve(choices, clock.now())
 
 # -------------- UI --------------
 
 
-def draw_ui(profile, schedule):
-    os.system("cls" if os.name == "nt" else "clear")
-    now = datetime.now()
-    current = None
-    upcoming = None
-
-    for task in schedule:
-        start = datetime.strptime(task["start"], "%Y-%m-%d %H:%M")
-        end = start + timedelta(minutes=task["duration"])
-        if start <= now < end:
-            current = task
-        elif start > now and not upcoming:
-            upcoming = task
+def dashboard_lines(profile, schedule, index, queue, now, eta):
+    current = index.current(now)
+    upcoming = index.upcoming(now)
 
     level = profile["level"]
     xp = profile["xp"]
@@ -220,66 +203,177 @@ def draw_ui(profile, schedule):
     xp_bar = draw_bar(xp, next_xp)
     love_bar = draw_bar(love, 200)
 
-    print("=" * 50)
-    print(f"👤 {profile['username']} | 🧬 Level {level} | XP: {xp}")
-    print(f"💖 Love XP: {love_bar} {love}/200")
-    print(
-        f"📅 Date: {now.strftime('%Y-%m-%d')} | 🕒 Time: {now.strftime('%H:%M')}")
-    print("-" * 50)
-    print(f"🔴 Current Task: {format_task(current)}")
-    print(f"🟡 Next Task   : {format_task(upcoming)}")
-    print("-" * 50)
-    print("📅 Schedule for Today:")
+    lines = [
+        "=" * 50,
+        f"👤 {profile['username']} | 🧬 Level {level} | XP: {xp}",
+        f"💖 Love XP: {love_bar} {love}/200",
+        f"📅 Date: {now.strftime('%Y-%m-%d')} | 🕒 Time: {now.strftime('%H:%M')}",
+        "-" * 50,
+        f"🔴 Current Task: {format_task(current)}",
+        f"🟡 Next Task   : {format_task(upcoming)}",
+        "-" * 50,
+        "📅 Schedule for Today:"
+    ]
     for task in schedule:
-        start = datetime.strptime(task["start"], "%Y-%m-%d %H:%M")
-        end = start + timedelta(minutes=task["duration"])
-        print(f"[{task['status']}] {task['name']:<12} {start.strftime('%H:%M')}–{end.strftime('%H:%M')}  XP: {task['xp']}")
-    print("-" * 50)
-    print(
-        f"📈 Avg XP/day: {int(sum(profile['xp_history'][-7:]) / max(1,len(profile['xp_history'][-7:])))} | ETA to next level: {get_days_to_next_level(profile)}")
-    print(
-        f"📈 Gained XP: +{profile['earned_xp_display']} | 💀 Lost XP: -{profile['lost_xp_display']}")
-    print("=" * 50)
+        lines.append(
+            f"[{task.icon}] {task.name:<12} {format_hhmm(task.start)}–{format_hhmm(task.end)}  XP: {task.xp}")
+    lines += [
+        "-" * 50,
+        f"📈 Avg XP/day: {int(progression.average_xp(profile['xp_history']))} | ETA to next level: {eta}",
+        f"📈 Gained XP: +{profile['earned_xp_display']} | 💀 Lost XP: -{profile['lost_xp_display']}",
+        "=" * 50
+    ]
+    if queue:
+        lines.append(f"⏳ {len(queue)} finished task(s) awaiting confirmation")
+    return lines
+
+
+def draw_ui(profile, schedule, index, queue, log, screen, stats=False):
+    with metrics.timed("render"):
+        now = clock.now()
+        eta = get_days_to_next_level(profile, log, now.date())
+        lines = dashboard_lines(profile, schedule, index, queue, now, eta)
+        if stats:
+            # The overlay shows the previous frame's render time
+            lines += metrics.overlay_lines() + ["=" * 50]
+        menu = "[1] Add Task  [2] View XP Log  [3] Confirm Tasks  [4] Stats  [5] History"
+        if metrics.PROFILER[0]:
+            menu += "  [p] Profile"
+        lines += [menu + "  [Enter] Refresh", "> "]
+        screen.render(lines)
+    metrics.gauge("pending_prompts", len(queue))
+    metrics.flush_due()
+
+
+def view_log(log):
+    page = 0
+    while True:
+        os.system("cls" if os.name == "nt" else "clear")
+        entries, has_older = log.tail_page(page)
+        for line in xp_log.format_page(entries):
+            print(line)
+        print("\n[o] Older  [n] Newer  [Enter] Return")
+        choice = input("> ").strip().lower()
+        if choice == "o" and has_older:
+            page += 1
+        elif choice == "n" and page > 0:
+            page -= 1
+        elif not choice:
+            return
+
+
+def view_history(db):
+    # A week of past days per page, newest week first; only that week's
+    # days are read from the archive
+    end = clock.now().date() - timedelta(days=1)
+    while True:
+        os.system("cls" if os.name == "nt" else "clear")
+        start = end - timedelta(days=6)
+        days = list(read_history(db, clock.now(), start.isoformat(), end.isoformat()))
+        print(f"📜 History {start} – {end}\n")
+        for day, tasks in reversed(days):
+            done = sum(t.status == DONE for t in tasks)
+            print(f"{day}  ✅ {done}/{len(tasks)}  XP: {sum(t.xp for t in tasks if t.status == DONE)}")
+            for task in tasks:
+                print(f"   [{task.icon}] {task.name:<12} {format_hhmm(task.start)}–{format_hhmm(task.end)}")
+        if not days:
+            print("No tasks in this week.")
+        before = (start - timedelta(days=1)).isoformat()
+        has_older = next(iter(read_history(db, clock.now(), None, before)), None) is not None
+        print("\n[o] Older  [n] Newer  [Enter] Return")
+        choice = input("> ").strip().lower()
+        if choice == "o" and has_older:
+            end = start - timedelta(days=1)
+        elif choice == "n" and end < clock.now().date() - timedelta(days=1):
+            end += timedelta(days=7)
+        elif not choice:
+            return
+
+
+def view_stats(log):
+    import analytics
+
+    os.system("cls" if os.name == "nt" else "clear")
+    stats = analytics.load_stats(log, clock.now().date())
+    for line in analytics.format_stats(stats, recurring.load_catalog(TASKS_PATH)):
+        print(line)
+    input("\nPress Enter to return...")
+
+
+def view_profile():
+    os.system("cls" if os.name == "nt" else "clear")
+    for line in metrics.profile_top():
+        print(line)
+    print(f"\nAlso written to {metrics.dump_profile()}.")
+    input("Press Enter to return...")
 
 # -------------- Main Loop --------------
 
 
-def main():
-    if not os.path.exists(PROFILE_PATH):
+def main(stats=False):
+    # A running daemon (daemon.py) owns the state; otherwise run our own engine
+    engine = remote = client.connect(clock.now())
+    if remote is None and not os.path.exists(PROFILE_PATH):
         profile = {
             "username": input("Enter your name: "),
             "xp": 0,
             "love_xp": 0,
             "level": 1,
-            "last_active": datetime.now().strftime("%Y-%m-%d"),
+            "last_active": clock.now().strftime("%Y-%m-%d"),
             "xp_history": [0]*7,
             "day_started": "",
             "can_schedule": True
         }
         save_json(PROFILE_PATH, profile)
-    profile = load_json(PROFILE_PATH, {})
-    schedule = load_json(SCHEDULE_PATH, [])
-    profile = apply_decay(profile)
-    profile = check_day_start(profile)
+    if remote is None:
+        engine = Engine({}, profile_path=PROFILE_PATH,
+                        schedule_path=SCHEDULE_PATH, log_path=LOG_PATH)
+    start_day(engine)
+    screen = Screen()
+    screen.watch_resize()
+    due = True
+    offer = False
 
     while True:
-        profile, schedule = update_status(profile, schedule)
-        profile["level"], _ = calculate_level(profile["xp"])
-        draw_ui(profile, schedule)
-        print("[1] Add Task  [2] View XP Log  [Enter] Refresh")
-        choice = input("> ").strip()
+        if due:
+            engine.tick(clock.now())
+        draw_ui(engine.profile, engine.schedule, engine.index, engine.queue,
+                engine.log, screen, stats)
+        # Sleep until the next transition, clock minute, keypress, push or resize
+        choice = wait_for_input(engine.ticker.delay(clock.now()), remote, screen)
+
+        kinds = engine.wake(clock.now())
+        if MIDNIGHT in kinds or WINDOW in kinds:
+            start_day(engine, ask=False)
+            offer = offer or MIDNIGHT in kinds
+        if choice is not None and offer:
+            offer = False
+            if in_window(engine.profile, clock.now()):
+                start_day(engine)
+        due = choice is not None or bool(kinds)
+
         if choice == "1":
-            add_tasks(profile, schedule)
+            add_tasks(engine)
         elif choice == "2":
-            if os.path.exists(LOG_PATH):
-                os.system("cls" if os.name == "nt" else "clear")
-                with open(LOG_PATH, "r") as f:
-                    print(f.read())
-                input("\n[Enter] to return...")
-        save_json(PROFILE_PATH, profile)
-        save_json(SCHEDULE_PATH, schedule)
-        time.sleep(1)  # Manual refresh every second
+            if engine.log.exists():
+                view_log(engine.log)
+        elif choice == "3":
+            if engine.queue:
+                confirm_tasks(engine)
+        elif choice == "4":
+            view_stats(engine.log)
+        elif choice == "5":
+            view_history(engine.db)
+        elif choice == "p" and metrics.PROFILER[0]:
+            view_profile()
+        if choice:
+            # Menus and prompts wrote over the last frame
+            screen.invalidate()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Perfect You in the terminal.")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.apply_arguments(args)
+    main(args.stats)
@@ -0,0 +1,136 @@
+import sys
+from math import isqrt
+
+BASE_XP = 200
+STEP_XP = 100
+DECAY = 0.9
+LOVE_DECAY = 0.95
+HISTORY_DAYS = 7
+
+# Reaching level n + 1 takes T(n) = STEP_XP * n(n+1)/2 + BASE_XP * n total
+# XP, so the level for a given XP is the root of a quadratic.
+ROOT_B = STEP_XP + 2 * BASE_XP
+
+# -------------- Levels --------------
+
+
+def xp_for_level(level):
+    return STEP_XP * level + BASE_XP
+
+
+def level_threshold(level):
+    # Total XP at which `level` is reached
+    n = level - 1
+    return STEP_XP * n * (n + 1) // 2 + BASE_XP * n
+
+
+def level_for_xp(xp):
+    if xp <= 0:
+        return 1
+    return (isqrt(ROOT_B * ROOT_B + 8 * STEP_XP * xp) - ROOT_B) // (2 * STEP_XP) + 1
+
+
+def level_progress(xp):
+    # (level, XP earned inside the level, XP the level takes)
+    level = level_for_xp(xp)
+    return level, xp - level_threshold(level), xp_for_level(level)
+
+
+def calculate_level(xp):
+    level = level_for_xp(xp)
+    return level, xp_for_level(level)
+
+# -------------- Decay & Forecast --------------
+
+
+def decay(xp, days, rate=DECAY):
+    return int(xp * (rate ** days))
+
+
+def average_xp(history, days=HISTORY_DAYS):
+    window = history[-days:]
+    return sum(window) / max(1, len(window))
+
+
+def days_to_next_level(xp, history):
+    # None when the recent average cannot reach the next level
+    avg = average_xp(history)
+    if avg <= 0:
+        return None
+    remaining = level_threshold(level_for_xp(xp) + 1) - xp
+    return round(remaining / avg, 1)
+
+# -------------- Batch --------------
+
+
+def load_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def batch_levels(xps):
+    np = load_numpy()
+    if np is None:
+        return [level_for_xp(xp) for xp in xps]
+    xp = np.maximum(np.asarray(xps, dtype=np.int64), 0)
+    n = (np.floor(np.sqrt(ROOT_B * ROOT_B + 8 * STEP_XP * xp.astype(np.float64)))
+         .astype(np.int64) - ROOT_B) // (2 * STEP_XP)
+    # Float sqrt can be one off for very large XP; correct against T(n)
+    n += level_threshold(n + 2) <= xp
+    n -= level_threshold(n + 1) > xp
+    return n + 1
+
+
+def batch_decay(xps, days, rate=DECAY):
+    np = load_numpy()
+    if np is None:
+        return [decay(xp, d, rate) for xp, d in zip(xps, days)]
+    xp = np.asarray(xps, dtype=np.float64)
+    return (xp * rate ** np.asarray(days, dtype=np.float64)).astype(np.int64)
+
+
+def batch_days_to_next_level(xps, averages):
+    # NaN (or None without NumPy) where the average is not positive
+    np = load_numpy()
+    if np is None:
+        return [days_to_next_level(xp, [avg]) for xp, avg in zip(xps, averages)]
+    xp = np.asarray(xps, dtype=np.int64)
+    avg = np.asarray(averages, dtype=np.float64)
+    remaining = level_threshold(batch_levels(xp) + 1) - xp
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(avg > 0, np.round(remaining / avg, 1), np.nan)
+
+# -------------- Self Check --------------
+
+
+def loop_level(xp):
+    # The original O(level) loop, kept as the reference for check()
+    level = 1
+    total = xp_for_level(level)
+    while xp >= total:
+        level += 1
+        total += xp_for_level(level)
+    return level
+
+
+def check(samples=5000):
+    import random
+    values = list(range(-5, 5000)) + [level_threshold(l) + d
+                                      for l in range(1, 1000) for d in (-1, 0, 1)]
+    values += [random.randrange(10 ** 7) for _ in range(samples)]
+    for xp in values:
+        assert level_for_xp(xp) == loop_level(xp), xp
+        level, into, span = level_progress(xp)
+        assert xp <= 0 or 0 <= into < span, xp
+    assert list(batch_levels(values)) == [loop_level(xp) for xp in values]
+    return len(values)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--check"]:
+        print(f"OK: {check()} values match the level loop.")
+    else:
+        print("Usage: python progression.py --check")
@@ -0,0 +1,271 @@
+import csv
+import re
+import sys
+from datetime import date, datetime, time, timedelta
+from operator import attrgetter
+
+import task_catalog
+from schedule_index import ScheduleIndex
+from store import load_json
+from task import Task, format_hhmm, from_minutes, to_minutes
+
+TEMPLATES_PATH = "templates.json"
+TASKS_PATH = task_catalog.TASKS_PATH
+HORIZON_DAYS = 366  # how far ahead new templates are checked for conflicts
+ONE_DAY = timedelta(days=1)
+
+DAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+DAY_SETS = {"daily": range(7), "weekdays": range(5), "weekends": (5, 6)}
+ICAL_DAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+ICAL_TIME = re.compile(r"^(\d{4})(\d{2})(\d{2})(?:T(\d{2})(\d{2})\d{0,2}Z?)?$")
+ICAL_DURATION = re.compile(r"^PT?(?:(\d+)H)?(?:(\d+)M)?(?:\d+S)?$")
+
+# -------------- Parsing --------------
+
+
+def parse_days(text):
+    # "Mon/Wed/Fri", "mon-fri", "weekdays", "daily" -> weekday bitmask
+    text = text.lower()
+    if text in DAY_SETS:
+        days = DAY_SETS[text]
+    else:
+        days = []
+        for part in re.split(r"[/,]", text):
+            first, _, last = part.partition("-")
+            if first[:3] not in DAY_NAMES or (last and last[:3] not in DAY_NAMES):
+                raise ValueError(f"Unknown day '{part}'")
+            lo = DAY_NAMES.index(first[:3])
+            hi = DAY_NAMES.index(last[:3]) if last else lo
+            days += range(lo, hi + 1)
+    mask = 0
+    for day in days:
+        mask |= 1 << day
+    return mask
+
+
+def parse_times(text):
+    # "07:00", "09,10", "9:30,14" -> sorted minutes after midnight
+    times = []
+    for part in text.split(","):
+        hour, _, minute = part.strip().partition(":")
+        hour, minute = int(hour), int(minute or 0)
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError(f"Invalid time '{part}'")
+        times.append(hour * 60 + minute)
+    return tuple(sorted(times))
+
+
+def parse_spec(text):
+    # "Gym Mon/Wed/Fri 07:00" -> template dict; the name may contain spaces
+    parts = text.split()
+    if len(parts) < 3:
+        return {"error": "Expected: name days times, e.g. Gym Mon/Wed/Fri 07:00"}
+    return {"name": " ".join(parts[:-2]), "days": parts[-2], "times": parts[-1]}
+
+
+def load_catalog(path=TASKS_PATH):
+    # Cached; reparsed only when the file changes
+    return task_catalog.load(path).by_name
+
+# -------------- Templates --------------
+
+
+class Template:
+    # A recurring task: the same name, duration and XP on some weekdays at
+    # some times, optionally between two dates. Occurrences are generated
+    # on demand and only become schedule entries on their own day.
+    __slots__ = ("name", "weekdays", "times", "duration", "xp", "first", "last", "data")
+
+    def __init__(self, data, catalog):
+        if "error" in data:
+            raise ValueError(data["error"])
+        known = catalog.get(data["name"], {})
+        for key in ("duration", "xp"):
+            if data.get(key) in (None, ""):
+                if key not in known:
+                    raise ValueError(
+                        f"Unknown task '{data['name']}': add it to tasks.json or give duration and xp")
+                data[key] = known[key]
+        self.name = data["name"]
+        self.weekdays = parse_days(data["days"])
+        self.times = parse_times(data["times"])
+        self.duration = int(data["duration"])
+        self.xp = int(data["xp"])
+        self.first = date.fromisoformat(data["from"]) if data.get("from") else None
+        self.last = date.fromisoformat(data["until"]) if data.get("until") else None
+        self.data = {key: data[key] for key in
+                     ("name", "days", "times", "duration", "xp", "from", "until")
+                     if data.get(key) not in (None, "")}
+
+    def to_dict(self):
+        return self.data
+
+    def on(self, day, base):
+        # Tasks on `day`, which starts at minute `base`
+        if (self.first and day < self.first) or (self.last and day > self.last) \
+                or not self.weekdays >> day.weekday() & 1:
+            return []
+        return [Task(self.name, base + minute, self.duration, self.xp)
+                for minute in self.times]
+
+    def occurrences(self, start, end):
+        # Tasks on each matching day in [start, end], within first..last
+        if self.first and self.first > start:
+            start = self.first
+        if self.last and self.last < end:
+            end = self.last
+        day = start
+        base = to_minutes(datetime.combine(start, time.min))
+        while day <= end:
+            yield from self.on(day, base)
+            day += ONE_DAY
+            base += 24 * 60
+
+
+def load(data, catalog):
+    return [Template(dict(item), catalog) for item in data]
+
+
+def expand(templates, start, end):
+    # Lazily yields every occurrence in [start, end] in start order, one
+    # day at a time, so any window can be walked without storing it
+    day = start
+    base = to_minutes(datetime.combine(start, time.min))
+    while day <= end:
+        yield from sorted((task for template in templates
+                           for task in template.on(day, base)),
+                          key=attrgetter("start"))
+        day += ONE_DAY
+        base += 24 * 60
+
+# -------------- Import --------------
+
+
+def read_csv(path):
+    # Header row, then either recurring rows (name, days, times) or dated
+    # rows (name, date, time); duration, xp, from and until are optional
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            row = {key.strip().lower(): (value or "").strip()
+                   for key, value in row.items() if key}
+            if row.get("date"):
+                row.update({"days": "daily", "times": row.pop("time", ""),
+                            "from": row["date"], "until": row.pop("date")})
+            yield reader.line_num, row
+
+
+def parse_ical_time(value):
+    match = ICAL_TIME.match(value)
+    if not match:
+        raise ValueError(f"Invalid date '{value}'")
+    y, mo, d, h, mi = match.groups()
+    return date(int(y), int(mo), int(d)), (None if h is None else int(h) * 60 + int(mi))
+
+
+def ical_event(props):
+    # One VEVENT's properties -> template dict (times are taken as local)
+    start_day, start = parse_ical_time(props["DTSTART"])
+    if start is None:
+        return {"error": "All-day events cannot be scheduled"}
+    if "DTEND" in props:
+        end_day, end = parse_ical_time(props["DTEND"])
+        duration = (end_day - start_day).days * 24 * 60 + (end or 0) - start
+    elif ICAL_DURATION.match(props.get("DURATION", "")):
+        hours, minutes = ICAL_DURATION.match(props["DURATION"]).groups()
+        duration = int(hours or 0) * 60 + int(minutes or 0)
+    else:
+        duration = None
+    data = {"name": props.get("SUMMARY", "").strip(), "times": format_hhmm(start),
+            "duration": duration, "from": start_day.isoformat()}
+
+    rule = dict(part.split("=", 1) for part in props.get("RRULE", "").split(";") if "=" in part)
+    if not rule:
+        data.update({"days": "daily", "until": start_day.isoformat()})
+        return data
+    if rule.get("FREQ") not in ("DAILY", "WEEKLY") or rule.get("INTERVAL", "1") != "1" \
+            or "COUNT" in rule:
+        return {"error": f"Unsupported repeat rule {props['RRULE']}"}
+    if rule["FREQ"] == "DAILY":
+        data["days"] = "daily"
+    else:
+        days = [ICAL_DAYS[d[-2:]] for d in rule.get("BYDAY", "").split(",") if d] \
+            or [start_day.weekday()]
+        data["days"] = "/".join(DAY_NAMES[d].title() for d in sorted(set(days)))
+    if "UNTIL" in rule:
+        data["until"] = parse_ical_time(rule["UNTIL"])[0].isoformat()
+    return data
+
+
+def read_ical(path):
+    # Streams VEVENTs; folded lines are joined and parameters dropped
+    number = 0
+    props = None
+    key = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_num, line in enumerate(f, 1):
+            line = line.rstrip("\r\n")
+            if line[:1] in (" ", "\t") and props is not None and key:
+                props[key] += line[1:]
+                continue
+            name, _, value = line.partition(":")
+            key = name.split(";")[0].upper()
+            if key == "BEGIN" and value == "VEVENT":
+                number, props = line_num, {}
+            elif key == "END" and value == "VEVENT" and props is not None:
+                try:
+                    yield number, ical_event(props)
+                except (KeyError, ValueError) as e:
+                    yield number, {"error": f"Invalid event: {e}"}
+                props = None
+            elif props is not None:
+                props[key] = value
+
+
+def read_file(path):
+    return read_ical(path) if path.lower().endswith((".ics", ".ical")) else read_csv(path)
+
+
+def validate(rows, templates, index, catalog, now):
+    # Checks numbered rows in one pass against the schedule index plus the
+    # existing templates' occurrences over the next HORIZON_DAYS, adding
+    # each accepted row's occurrences so later rows are checked against it
+    # too. Returns (accepted templates, error messages).
+    start = now.date()
+    end = start + timedelta(days=HORIZON_DAYS)
+    taken = ScheduleIndex(list(index.entries) + list(expand(templates, start, end)))
+    accepted = []
+    errors = []
+    for number, data in rows:
+        try:
+            template = Template(data, catalog)
+        except (KeyError, ValueError) as e:
+            errors.append(f"Row {number}: {e}")
+            continue
+        occurrences = list(template.occurrences(start, end))
+        clash = next(((task, other) for task in occurrences
+                      for other in taken.overlapping(task.start, task.end)), None)
+        if clash:
+            task, other = clash
+            errors.append(f"Row {number}: {task.name} overlaps {other.name} on "
+                          f"{from_minutes(task.start):%Y-%m-%d %H:%M}")
+            continue
+        if len(occurrences) == 1:
+            taken.add(occurrences[0])
+        else:
+            taken.extend(occurrences)
+        accepted.append(template)
+    return accepted, errors
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["show"]:
+        first = date.fromisoformat(args[1]) if len(args) > 1 else date.today()
+        last = date.fromisoformat(args[2]) if len(args) > 2 else first + timedelta(days=6)
+        templates = load(load_json(TEMPLATES_PATH, []), load_catalog())
+        for task in expand(templates, first, last):
+            print(f"{from_minutes(task.start):%a %Y-%m-%d %H:%M}  {task.name} "
+                  f"({task.duration}m, {task.xp} XP)")
+    else:
+        print("Usage: python recurring.py show [from] [to]")
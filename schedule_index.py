@@ -0,0 +1,47 @@
+import bisect
+from operator import attrgetter
+
+from task import to_minutes
+
+# -------------- Schedule Index --------------
+
+
+class ScheduleIndex:
+    # Entries sorted by start minute. Every entry overlapping a window must
+    # start at most max_duration minutes before it, which bounds the bisect.
+
+    def __init__(self, schedule=()):
+        self.entries = sorted(schedule, key=lambda t: t.start)
+        self.starts = [t.start for t in self.entries]
+        self.max_duration = max((t.duration for t in self.entries), default=0)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, task):
+        i = bisect.bisect_right(self.starts, task.start)
+        self.starts.insert(i, task.start)
+        self.entries.insert(i, task)
+        self.max_duration = max(self.max_duration, task.duration)
+
+    def extend(self, tasks):
+        # One merge for a batch instead of an insert per task
+        if not tasks:
+            return
+        self.entries += tasks
+        self.entries.sort(key=attrgetter("start"))
+        self.starts = [t.start for t in self.entries]
+        self.max_duration = max(self.max_duration, max(t.duration for t in tasks))
+
+    def overlapping(self, start, end):
+        lo = bisect.bisect_right(self.starts, start - self.max_duration)
+        hi = bisect.bisect_left(self.starts, end)
+        return [t for t in self.entries[lo:hi] if t.end > start]
+
+    def current(self, now):
+        found = self.overlapping(to_minutes(now), to_minutes(now) + 1)
+        return found[-1] if found else None
+
+    def upcoming(self, now):
+        i = bisect.bisect_right(self.starts, to_minutes(now))
+        return self.entries[i] if i < len(self.entries) else None
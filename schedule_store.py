@@ -0,0 +1,187 @@
+import bisect
+import json
+import os
+from collections import defaultdict
+
+import snapshot
+from store import Document
+from task import DONE, MISSED, Task
+
+SCHEDULE_DIR = "schedule"
+ARCHIVE_DIR = "schedule_archive"
+ARCHIVE_NAME = "archive.snap"
+
+# -------------- Partitions --------------
+
+
+class ScheduleStore:
+    # The schedule split into one journaled document per day under
+    # SCHEDULE_DIR. Only today's partition, plus past days that still have
+    # unresolved tasks, are kept open. Finished days are rolled into one
+    # binary snapshot (snapshot.py) under ARCHIVE_DIR, read only by
+    # read_history().
+    # Behaves like a single Document of Task records for iteration, update()
+    # and append().
+
+    def __init__(self, now, directory=SCHEDULE_DIR, archive_dir=ARCHIVE_DIR,
+                 legacy_path=None):
+        self.directory = directory
+        self.archive_dir = archive_dir
+        self.days = []
+        self.docs = []
+        os.makedirs(directory, exist_ok=True)
+        os.makedirs(archive_dir, exist_ok=True)
+        self.import_months()
+        if legacy_path and os.path.exists(legacy_path):
+            self.import_legacy(legacy_path, now)
+        self.rollover(now)
+
+    def path(self, day):
+        return os.path.join(self.directory, day + ".json")
+
+    def open_day(self, day):
+        i = bisect.bisect_left(self.days, day)
+        if i < len(self.days) and self.days[i] == day:
+            return self.docs[i]
+        doc = Document(self.path(day), [], journal=True, item_type=Task)
+        self.days.insert(i, day)
+        self.docs.insert(i, doc)
+        return doc
+
+    def close_day(self, day):
+        i = self.days.index(day)
+        del self.days[i]
+        del self.docs[i]
+
+    # ---------- Document interface ----------
+
+    def __iter__(self):
+        for doc in self.docs:
+            yield from doc
+
+    def __len__(self):
+        return sum(len(doc) for doc in self.docs)
+
+    def locate(self, i):
+        for doc in self.docs:
+            if i < len(doc):
+                return doc, i
+            i -= len(doc)
+        raise IndexError("schedule index out of range")
+
+    def __getitem__(self, i):
+        doc, j = self.locate(i)
+        return doc[j]
+
+    def position(self, task):
+        offset = 0
+        for doc in self.docs:
+            if task in doc.data:
+                return offset + doc.position(task)
+            offset += len(doc)
+        raise ValueError("task is not in an open partition")
+
+    def update(self, i, **fields):
+        doc, j = self.locate(i)
+        doc.update(j, **fields)
+
+    def append(self, task):
+        self.open_day(task.day).append(task)
+
+    def flush(self):
+        return any([doc.flush() for doc in self.docs])
+
+    # ---------- Rollover ----------
+
+    def rollover(self, now):
+        # Archive every finished day before today and make sure today's
+        # partition is open
+        today = now.strftime("%Y-%m-%d")
+        days = {}
+        finished = []
+        for name in sorted(os.listdir(self.directory)):
+            day = name[:-len(".json")]
+            if not name.endswith(".json") or day >= today:
+                continue
+            doc = self.open_day(day)
+            if all(t.status in (DONE, MISSED) for t in doc):
+                if len(doc):
+                    days[day] = list(doc)
+                finished.append(day)
+
+        if days:
+            self.archive(days)
+        for day in finished:
+            self.close_day(day)
+            for path in (self.path(day), self.path(day) + ".journal"):
+                if os.path.exists(path):
+                    os.remove(path)
+        self.open_day(today)
+
+    def archive_path(self):
+        return os.path.join(self.archive_dir, ARCHIVE_NAME)
+
+    def archive(self, days):
+        # Rewrites the snapshot with `days` ({day: [Task, ...]}) merged in;
+        # a few hundred KB for years of history, and once a day at most
+        path = self.archive_path()
+        merged = snapshot.read_all(path)
+        merged.update(days)
+        snapshot.write(path, merged)
+
+    # ---------- Migration ----------
+
+    def import_months(self):
+        # Folds the monthly YYYY-MM.json archives of earlier versions into
+        # the snapshot
+        days = dict(read_months(self.archive_dir))
+        if days:
+            self.archive(days)
+            for name in os.listdir(self.archive_dir):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.archive_dir, name))
+
+    def import_legacy(self, legacy_path, now):
+        # Splits an old single-file schedule.json (and its journal): its
+        # finished past days go straight into the archive in one write, the
+        # rest into day partitions. The original is kept as <path>.bak.
+        legacy = Document(legacy_path, [], journal=True, item_type=Task)
+        today = now.strftime("%Y-%m-%d")
+        days = defaultdict(list)
+        for task in legacy:
+            days[task.day].append(task)
+        finished = {day: tasks for day, tasks in days.items() if day < today and
+                    all(t.status in (DONE, MISSED) for t in tasks)}
+        if finished:
+            self.archive(finished)
+        for day, tasks in days.items():
+            if day not in finished:
+                for task in tasks:
+                    self.append(task)
+        self.flush()
+        for doc in self.docs:
+            doc.compact()
+        os.replace(legacy_path, legacy_path + ".bak")
+        if os.path.exists(legacy.journal_path):
+            os.remove(legacy.journal_path)
+
+
+def read_history(start=None, end=None, archive_dir=ARCHIVE_DIR):
+    # Lazily yields archived (day, tasks) oldest first; only the day table
+    # and the records in [start, end] are read
+    path = os.path.join(archive_dir, ARCHIVE_NAME)
+    if not os.path.exists(path):
+        return
+    with snapshot.Snapshot(path) as snap:
+        yield from snap.history(start, end)
+
+
+def read_months(archive_dir):
+    # (day, tasks) from the monthly JSON archives of earlier versions
+    for name in sorted(os.listdir(archive_dir)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(archive_dir, name), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for day in sorted(data):
+            yield day, [Task.from_dict(t) for t in data[day]]
@@ -0,0 +1,74 @@
+import os
+import shutil
+import signal
+import sys
+
+CLEAR = "\x1b[2J\x1b[H"
+CLEAR_LINE = "\x1b[K"
+CLEAR_BELOW = "\x1b[J"
+
+# -------------- Renderer --------------
+
+
+class Screen:
+    # Keeps the last frame and only rewrites the lines that changed, using
+    # ANSI cursor moves instead of spawning `clear`. Lines are diffed as a
+    # whole because emoji widths make column offsets unreliable. The last
+    # line is always rewritten so the cursor ends up after it (the prompt).
+
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+        self.frame = []
+        self.size = None
+        self.bytes_written = 0
+        self.resize_fd = None
+        if os.name == "nt":
+            os.system("")  # enables ANSI escape handling in the console
+
+    def invalidate(self):
+        # Call after anything else wrote to the terminal
+        self.frame = []
+        self.size = None
+
+    def watch_resize(self):
+        # Redraws in full after a SIGWINCH. Returns a file descriptor that
+        # becomes readable on each resize, so a select() waiting for input
+        # wakes to draw the new layout (None where there is no SIGWINCH).
+        if not hasattr(signal, "SIGWINCH"):
+            return None
+        read, write = os.pipe()
+        os.set_blocking(read, False)
+        os.set_blocking(write, False)
+        signal.signal(signal.SIGWINCH, lambda signum, frame: self.invalidate())
+        # Written from the C-level handler, so it wakes select() whichever
+        # thread the signal lands on
+        signal.set_wakeup_fd(write, warn_on_full_buffer=False)
+        self.resize_fd = read
+        return read
+
+    def resized(self):
+        # Clears pending wakeups (any signal writes one); True if there
+        # were any
+        try:
+            return bool(os.read(self.resize_fd, 512))
+        except BlockingIOError:
+            return False
+
+    def render(self, lines):
+        size = shutil.get_terminal_size()
+        parts = []
+        # A frame taller than the terminal scrolls, so row offsets are lost
+        if size != self.size or len(lines) >= size.lines:
+            parts.append(CLEAR)
+            self.frame = []
+            self.size = size
+        last = len(lines) - 1
+        for row, line in enumerate(lines):
+            if row == last or row >= len(self.frame) or self.frame[row] != line:
+                parts.append(f"\x1b[{row + 1};1H{line}{CLEAR_LINE}")
+        parts.append(CLEAR_BELOW)
+        text = "".join(parts)
+        self.out.write(text)
+        self.out.flush()
+        self.bytes_written += len(text.encode('utf-8'))
+        self.frame = list(lines)
@@ -0,0 +1,174 @@
+import argparse
+import itertools
+import json
+import random
+import time
+from datetime import date, datetime, timedelta
+
+import clock
+import recurring
+import sqlite_store
+import store
+from engine import Engine, update_status
+from progression import level_for_xp
+from task import Task, to_minutes
+
+START_HOUR = 7
+DEFAULT_TASK = {"name": "Focus", "duration": 60, "xp": 25}
+# Not real files, so nothing is read from or written to the app's data
+PROFILE_PATH = "simulate/profile.json"
+TEMPLATES_PATH = "simulate/templates.json"
+
+# Each simulated day:
+#   - the clock jumps to the day start (or past the window on a late
+#     start), through midnight decay, rollover and recurring tasks
+#   - the day is started with Engine.start_day, as the front-ends do
+#   - `tasks` catalog tasks are scheduled back to back from the hour after
+#   - the clock jumps from one ticker transition to the next
+#   - before midnight the day's tasks are confirmed in one batch, each
+#     done with probability `done`, and the state is saved
+# Nothing sleeps and storage is an in-memory SQLite database.
+
+# -------------- Driving --------------
+
+
+def make_profile(start, start_hour):
+    return {
+        "username": "Simulated", "xp": 0, "love_xp": 0, "level": 1,
+        "last_active": start.strftime("%Y-%m-%d"), "xp_history": [0] * 7,
+        "start_hour": start_hour, "day_started": "", "can_schedule": False,
+        "earned_xp_display": 0, "lost_xp_display": 0
+    }
+
+
+def step(engine, now):
+    # engine.tick without the flush; the simulation saves once a day
+    engine.wake(now)
+    update_status(engine.profile, engine.schedule, engine.queue, now)
+
+
+def run_until(engine, sim_clock, until):
+    # Every transition up to `until`, then `until` itself
+    while True:
+        delay = engine.ticker.delay(sim_clock.now())
+        if delay is None or sim_clock.now() + timedelta(seconds=delay) > until:
+            break
+        sim_clock.advance(timedelta(seconds=delay))
+        step(engine, sim_clock.now())
+    sim_clock.set(until)
+    step(engine, until)
+
+
+def confirm(engine, now, decide, totals):
+    # One batch for everything queued, like the confirmation menus
+    if not engine.queue:
+        return
+    outcomes = {task: decide(task) for task in engine.queue}
+    earned, lost = engine.resolve(outcomes, now)
+    totals["earned"] += earned
+    totals["lost"] += lost
+    totals["done"] += sum(outcomes.values())
+    totals["missed"] += len(outcomes) - sum(outcomes.values())
+
+
+def plan_day(catalog, count, day, start_hour):
+    start = to_minutes(datetime.combine(day, datetime.min.time())) + (start_hour + 1) * 60
+    tasks = []
+    for data in itertools.islice(itertools.cycle(catalog), count):
+        tasks.append(Task(data["name"], start, data["duration"], data["xp"]))
+        start += data["duration"]
+    return tasks
+
+
+def simulate(days=365, start=None, tasks=8, done=0.8, late=0.0, seed=0,
+             start_hour=START_HOUR, templates=(), tasks_path=recurring.TASKS_PATH):
+    rng = random.Random(seed)
+    start = start or date.today()
+    now = datetime.combine(start, datetime.min.time())
+    sim_clock = clock.ManualClock(now)
+    previous = clock.CLOCK, store.BACKEND
+    db = sqlite_store.memory(f"simulate-{id(sim_clock)}")
+    totals = {"earned": 0, "lost": 0, "done": 0, "missed": 0, "late": 0, "conflicts": 0}
+    levels = []
+    decide = lambda task: rng.random() < done
+    began = time.perf_counter()
+    try:
+        clock.use_clock(sim_clock)
+        engine = Engine(make_profile(start, start_hour), now, clock_minutes=False,
+                        profile_path=PROFILE_PATH, templates_path=TEMPLATES_PATH,
+                        tasks_path=tasks_path, db=db)
+        catalog = list(recurring.load_catalog(tasks_path).values()) or [DEFAULT_TASK]
+        rows = [(i + 1, recurring.parse_spec(spec)) for i, spec in enumerate(templates)]
+        _, errors = engine.import_templates(rows, now)
+
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            morning = datetime.combine(day, datetime.min.time()) + timedelta(hours=start_hour)
+            is_late = rng.random() < late
+            run_until(engine, sim_clock, morning + timedelta(hours=2 if is_late else 0))
+
+            now = sim_clock.now()
+            totals["late"] += engine.start_day(True, now)
+            if engine.profile["can_schedule"]:
+                for task in plan_day(catalog, tasks, day, start_hour):
+                    totals["conflicts"] += not engine.add(task, now)
+
+            run_until(engine, sim_clock, morning.replace(hour=23, minute=59))
+            confirm(engine, sim_clock.now(), decide, totals)
+            engine.flush()
+            # The first day each level was reached; decay can drop it again
+            level = level_for_xp(engine.profile["xp"])
+            if level > (levels[-1][1] if levels else 1):
+                levels.append((offset + 1, level))
+        engine.flush()
+    finally:
+        clock.use_clock(previous[0])
+        store.use_backend(previous[1])
+        db.close()
+    elapsed = time.perf_counter() - began
+
+    return {
+        "days": days,
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "xp": engine.profile["xp"],
+        "level": level_for_xp(engine.profile["xp"]),
+        **totals,
+        "template_errors": errors,
+        "levels": levels
+    }
+
+
+def format_result(result):
+    lines = [
+        f"Simulated {result['days']} days in {result['elapsed_ms']:.0f} ms",
+        f"Level {result['level']} with {result['xp']} XP",
+        f"Tasks: {result['done']} done, {result['missed']} missed, "
+        f"{result['conflicts']} not scheduled (overlap)",
+        f"XP: +{result['earned']} earned, -{result['lost']} lost, "
+        f"{result['late']} late day starts",
+        "Level-ups: " + (", ".join(f"L{level} on day {day}"
+                                   for day, level in result["levels"]) or "none"),
+    ]
+    return lines + [f"⚠️ {error}" for error in result["template_errors"]]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Drive the engine through scripted days on a simulated clock.")
+    parser.add_argument("days", nargs="?", type=int, default=365)
+    parser.add_argument("--from", dest="start", type=date.fromisoformat,
+                        help="first simulated day (default: today)")
+    parser.add_argument("--tasks", type=int, default=8, help="tasks scheduled per day")
+    parser.add_argument("--done", type=float, default=0.8,
+                        help="probability a finished task is confirmed done")
+    parser.add_argument("--late", type=float, default=0.0,
+                        help="probability a day is started after its window")
+    parser.add_argument("--start-hour", type=int, default=START_HOUR)
+    parser.add_argument("--template", action="append", default=[],
+                        help='recurring task, e.g. "Gym Mon/Wed/Fri 06:00"')
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args()
+    result = simulate(args.days, args.start, args.tasks, args.done, args.late, args.seed,
+                      args.start_hour, args.template)
+    print(json.dumps(result) if args.json else "\n".join(format_result(result)))
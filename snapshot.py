@@ -0,0 +1,205 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from datetime import date, timedelta
+
+import metrics
+from store import write_atomic
+from task import Task, format_day
+
+MAGIC = b"PYSS"
+VERSION = 1
+EPOCH_DAY = date(1970, 1, 1)
+
+# Layout, little-endian:
+#   header    magic, version, string/day/record counts, section offsets
+#   strings   (count + 1) uint32 offsets into the UTF-8 blob that follows
+#   days      (day number, first record, record count), sorted by day
+#   records   (name string, start minute, duration, xp, status), by start
+# A reader maps the file and unpacks the header, then binary-searches the
+# day table, so a day costs a few small reads whatever the file size.
+HEADER = struct.Struct("<4sHHIIIIII")
+OFFSET = struct.Struct("<I")
+DAY = struct.Struct("<iII")
+RECORD = struct.Struct("<IiHiB")
+
+
+def day_number(day):
+    return (date.fromisoformat(day) - EPOCH_DAY).days
+
+
+def day_string(number):
+    return (EPOCH_DAY + timedelta(days=number)).isoformat()
+
+# -------------- Writing --------------
+
+
+def encode(days):
+    # days: {"YYYY-MM-DD": [Task, ...]}
+    names = {}
+    records = []
+    table = []
+    for day in sorted(days):
+        tasks = sorted(days[day], key=lambda t: t.start)
+        if not tasks:
+            continue
+        table.append(DAY.pack(day_number(day), len(records), len(tasks)))
+        for t in tasks:
+            string = names.setdefault(t.name, len(names))
+            records.append(RECORD.pack(string, t.start, t.duration, t.xp, t.status))
+
+    blob = [name.encode('utf-8') for name in names]
+    offsets = [0]
+    for data in blob:
+        offsets.append(offsets[-1] + len(data))
+    strings = b"".join(OFFSET.pack(o) for o in offsets) + b"".join(blob)
+    strings_at = HEADER.size
+    days_at = strings_at + len(strings)
+    records_at = days_at + len(table) * DAY.size
+    header = HEADER.pack(MAGIC, VERSION, 0, len(names), len(table), len(records),
+                         strings_at, days_at, records_at)
+    return header + strings + b"".join(table) + b"".join(records)
+
+
+def write(path, days):
+    write_atomic(path, encode(days))
+
+# -------------- Reading --------------
+
+
+class Snapshot:
+    # A snapshot mapped read-only; nothing past the header is read until a
+    # day is asked for. Use as a context manager or close() it.
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.map = None
+        self.days = self.records = self.strings = 0
+        if os.fstat(self.file.fileno()).st_size == 0:
+            return
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.strings, self.days, self.records, \
+            self.strings_at, self.days_at, self.records_at = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a snapshot")
+        if version > VERSION:
+            raise ValueError(f"{path} is snapshot version {version}; "
+                             f"this version reads up to {VERSION}")
+        self.blob_at = self.strings_at + (self.strings + 1) * OFFSET.size
+        self.names = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+    def __len__(self):
+        return self.records
+
+    def name(self, i):
+        if i not in self.names:
+            start, end = struct.unpack_from("<II", self.map, self.strings_at + i * OFFSET.size)
+            self.names[i] = bytes(self.map[self.blob_at + start:self.blob_at + end]).decode('utf-8')
+        return self.names[i]
+
+    def day_entry(self, i):
+        return DAY.unpack_from(self.map, self.days_at + i * DAY.size)
+
+    def find(self, number):
+        # Position of the first day table entry on or after day `number`
+        lo, hi = 0, self.days
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.day_entry(mid)[0] < number:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def tasks(self, first, count):
+        tasks = []
+        for offset in range(self.records_at + first * RECORD.size,
+                            self.records_at + (first + count) * RECORD.size, RECORD.size):
+            string, start, duration, xp, status = RECORD.unpack_from(self.map, offset)
+            tasks.append(Task(self.name(string), start, duration, xp, status))
+        metrics.file_bytes(self.file.name, "read", count * RECORD.size)
+        return tasks
+
+    def day(self, day):
+        if not self.days:
+            return []
+        number = day_number(day)
+        i = self.find(number)
+        if i == self.days or self.day_entry(i)[0] != number:
+            return []
+        _, first, count = self.day_entry(i)
+        return self.tasks(first, count)
+
+    def history(self, start=None, end=None):
+        # (day, tasks) oldest first, within [start, end] when given
+        i = self.find(day_number(start)) if start and self.days else 0
+        last = day_number(end) if end else None
+        while i < self.days:
+            number, first, count = self.day_entry(i)
+            if last is not None and number > last:
+                break
+            yield day_string(number), self.tasks(first, count)
+            i += 1
+
+
+def read_all(path):
+    # {day: [Task, ...]} for the whole file, or {} when there is none
+    if not os.path.exists(path):
+        return {}
+    with Snapshot(path) as snap:
+        return dict(snap.history())
+
+# -------------- JSON --------------
+#
+# JSON stays the interchange format: {"YYYY-MM-DD": [task dicts]}, as the
+# monthly archive files were written.
+
+
+def export_json(path, json_path):
+    data = {day: [t.to_dict() for t in tasks] for day, tasks in read_all(path).items()}
+    write_atomic(json_path, json.dumps(data, indent=4, ensure_ascii=False))
+    return sum(len(tasks) for tasks in data.values())
+
+
+def import_json(json_path, path):
+    # Merged into an existing snapshot; imported days replace its days
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    days = read_all(path)
+    for day, tasks in data.items():
+        days[day] = [Task.from_dict(t) for t in tasks]
+        for t in days[day]:
+            if format_day(t.start) != day:
+                raise ValueError(f"{t.name} starts on {format_day(t.start)}, not {day}")
+    write(path, days)
+    return sum(len(data[day]) for day in data)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if len(args) == 3 and args[0] == "export":
+        print(f"Exported {export_json(args[1], args[2])} tasks to {args[2]}.")
+    elif len(args) == 3 and args[0] == "import":
+        print(f"Imported {import_json(args[1], args[2])} tasks into {args[2]}.")
+    elif len(args) == 3 and args[0] == "show":
+        with Snapshot(args[1]) as snap:
+            for t in snap.day(args[2]):
+                print(f"[{t.icon}] {t.name} {t.to_dict()['start']} {t.duration}m {t.xp} XP")
+    else:
+        print("Usage: python snapshot.py export SNAPSHOT FILE.json\n"
+              "       python snapshot.py import FILE.json SNAPSHOT\n"
+              "       python snapshot.py show SNAPSHOT YYYY-MM-DD")
+        sys.exit(1)
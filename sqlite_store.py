@@ -0,0 +1,399 @@
+import itertools
+import json
+import os
+import queue
+import sqlite3
+import sys
+from contextlib import contextmanager
+from datetime import datetime, time
+
+import snapshot
+import xp_log
+from schedule_store import ARCHIVE_DIR, ARCHIVE_NAME, SCHEDULE_DIR, read_months
+from store import Document
+from task import (ACTIVE, PENDING, TIME_FORMAT, Task, format_day, from_minutes,
+                  parse_minutes, to_minutes)
+
+DB_PATH = "perfect_u.db"
+POOL_SIZE = 4
+DAY_MINUTES = 24 * 60
+
+# Tasks and log entries carry the path of the profile they belong to, so
+# several profiles share one file and every query stays on its own rows.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    profile TEXT NOT NULL,
+    name TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    duration INTEGER NOT NULL,
+    xp INTEGER NOT NULL,
+    status INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_profile_start ON tasks (profile, start);
+CREATE INDEX IF NOT EXISTS tasks_profile_status ON tasks (profile, status);
+CREATE TABLE IF NOT EXISTS xp_log (
+    id INTEGER PRIMARY KEY,
+    profile TEXT NOT NULL,
+    time INTEGER NOT NULL,
+    task TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    xp INTEGER NOT NULL,
+    start INTEGER
+);
+CREATE INDEX IF NOT EXISTS xp_log_profile_time ON xp_log (profile, time);
+"""
+
+# Statements are fixed strings with placeholders, so each connection's
+# statement cache prepares them once and reuses them
+LOAD_DOCUMENT = "SELECT data FROM documents WHERE path = ?"
+SAVE_DOCUMENT = "INSERT OR REPLACE INTO documents (path, data) VALUES (?, ?)"
+TASK_COLUMNS = "id, name, start, duration, xp, status"
+DAY_TASKS = f"SELECT {TASK_COLUMNS} FROM tasks " \
+    "WHERE profile = ? AND start >= ? AND start < ? ORDER BY id"
+OPEN_TASKS = f"SELECT {TASK_COLUMNS} FROM tasks " \
+    "WHERE profile = ? AND status IN (?, ?) AND start < ? ORDER BY id"
+HISTORY = f"SELECT {TASK_COLUMNS} FROM tasks " \
+    "WHERE profile = ? AND start >= ? AND start < ? ORDER BY start, id"
+INSERT_TASK = "INSERT INTO tasks (profile, name, start, duration, xp, status) " \
+    "VALUES (?, ?, ?, ?, ?, ?)"
+UPDATE_TASK = "UPDATE tasks SET name = ?, start = ?, duration = ?, xp = ?, " \
+    "status = ? WHERE id = ?"
+INSERT_ENTRY = "INSERT INTO xp_log (profile, time, task, outcome, xp, start) " \
+    "VALUES (?, ?, ?, ?, ?, ?)"
+LOG_ANY = "SELECT 1 FROM xp_log WHERE profile = ? LIMIT 1"
+LOG_PAGE = "SELECT time, task, outcome, xp, start FROM xp_log WHERE profile = ? " \
+    "ORDER BY time DESC, id DESC LIMIT ? OFFSET ?"
+LOG_FROM = "SELECT time, task, outcome, xp, start FROM xp_log " \
+    "WHERE profile = ? AND time >= ? ORDER BY time, id"
+LOG_LAST = "SELECT id FROM xp_log WHERE profile = ? ORDER BY id DESC LIMIT 1"
+LOG_SINCE = "SELECT time, task, outcome, xp, start, id FROM xp_log " \
+    "WHERE profile = ? AND id > ? ORDER BY id"
+LOG_RANGE = "SELECT time, task, outcome, xp, start FROM xp_log " \
+    "WHERE profile = ? AND time >= ? AND time < ? ORDER BY time, id"
+
+# -------------- Connections --------------
+
+
+def day_minutes(day):
+    return parse_minutes(day + " 00:00")
+
+
+class Database:
+    # A small pool of connections to one SQLite file. WAL mode lets the
+    # daemon, front-ends and batch jobs read while one of them writes.
+
+    def __init__(self, path=DB_PATH, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self.idle = queue.LifoQueue()
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+            # Databases from before log entries kept their task's start
+            if "start" not in [row[1] for row in conn.execute("PRAGMA table_info(xp_log)")]:
+                conn.execute("ALTER TABLE xp_log ADD COLUMN start INTEGER")
+
+    def open(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False,
+                               cached_statements=64, uri=self.path.startswith("file:"))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        # One transaction: committed on success, rolled back on error
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            conn = self.open()
+        try:
+            with conn:
+                yield conn
+        finally:
+            if self.idle.qsize() < self.size:
+                self.idle.put(conn)
+            else:
+                conn.close()
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get_nowait().close()
+
+
+def connect(path=DB_PATH):
+    # The database once `python sqlite_store.py migrate` created it
+    return Database(path) if os.path.exists(path) else None
+
+
+def memory(name):
+    # A private in-memory database; it lives while the pool holds a connection
+    return Database(f"file:{name}?mode=memory&cache=shared", size=1)
+
+# -------------- Documents --------------
+
+
+class SqliteBackend:
+    # Documents as rows keyed by their path (see store.use_backend). A path
+    # without a row falls back to its file, so hand-edited files such as
+    # tasks.json keep working and a profile written before the switch is
+    # picked up on its first load.
+
+    def __init__(self, db):
+        self.db = db
+
+    def read(self, path):
+        with self.db.connection() as conn:
+            row = conn.execute(LOAD_DOCUMENT, (path,)).fetchone()
+        return row[0] if row else None
+
+    def exists(self, path):
+        return self.read(path) is not None or os.path.exists(path)
+
+    def load(self, path, default):
+        text = self.read(path)
+        if text is None and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        if text is None:
+            text = json.dumps(default, indent=4)
+            self.write(path, text)
+        return json.loads(text)
+
+    def write(self, path, text):
+        with self.db.connection() as conn:
+            conn.execute(SAVE_DOCUMENT, (path, text))
+
+# -------------- Schedule --------------
+
+
+class SqliteSchedule:
+    # The schedule as rows of the tasks table, with the interface of
+    # schedule_store.ScheduleStore. Only today's rows and unresolved rows
+    # from earlier days are loaded; flush() writes the changed ones in one
+    # transaction. Finished days stay in the table, so rollover just
+    # reloads.
+
+    def __init__(self, db, profile, now):
+        self.db = db
+        self.profile = profile
+        self.tasks = []
+        self.ids = []
+        self.dirty = set()
+        self.today = 0
+        self.rollover(now)
+
+    def __iter__(self):
+        return iter(self.tasks)
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __getitem__(self, i):
+        return self.tasks[i]
+
+    def position(self, task):
+        return self.tasks.index(task)
+
+    def update(self, i, **fields):
+        for key, value in fields.items():
+            setattr(self.tasks[i], key, value)
+        self.dirty.add(i)
+
+    def append(self, task):
+        self.tasks.append(task)
+        self.ids.append(None)
+        self.dirty.add(len(self.tasks) - 1)
+
+    def flush(self):
+        if not self.dirty:
+            return False
+        inserted = {}
+        with self.db.connection() as conn:
+            for i in sorted(self.dirty):
+                task = self.tasks[i]
+                row = (task.name, task.start, task.duration, task.xp, task.status)
+                if self.ids[i] is None:
+                    inserted[i] = conn.execute(
+                        INSERT_TASK, (self.profile,) + row).lastrowid
+                else:
+                    conn.execute(UPDATE_TASK, row + (self.ids[i],))
+        for i, row_id in inserted.items():
+            self.ids[i] = row_id
+        self.dirty = set()
+        return True
+
+    def rollover(self, now):
+        self.flush()
+        self.today = to_minutes(datetime.combine(now.date(), time.min))
+        with self.db.connection() as conn:
+            rows = conn.execute(
+                OPEN_TASKS, (self.profile, PENDING, ACTIVE, self.today)).fetchall()
+            rows += conn.execute(
+                DAY_TASKS, (self.profile, self.today, self.today + DAY_MINUTES)).fetchall()
+        # Tasks still loaded keep their identity (the confirm queue holds them)
+        known = dict(zip(self.ids, self.tasks))
+        self.ids = [row[0] for row in rows]
+        self.tasks = [known.get(row[0]) or Task(*row[1:]) for row in rows]
+
+
+def read_history(db, profile, now, start=None, end=None):
+    # Lazily yields (day, tasks) for days before now's, oldest first,
+    # reading only the rows between start and end
+    today = to_minutes(datetime.combine(now.date(), time.min))
+    lo = day_minutes(start) if start else 0
+    hi = min(day_minutes(end) + DAY_MINUTES, today) if end else today
+    with db.connection() as conn:
+        rows = conn.execute(HISTORY, (profile, lo, hi))
+        for day, group in itertools.groupby(rows, key=lambda r: r[2] // DAY_MINUTES):
+            yield format_day(day * DAY_MINUTES), [Task(*r[1:]) for r in group]
+
+# -------------- XP Log --------------
+
+
+def make_entry(row):
+    entry = {
+        "time": from_minutes(row[0]).strftime(TIME_FORMAT),
+        "task": row[1],
+        "outcome": row[2],
+        "xp": row[3]
+    }
+    if row[4] is not None:
+        entry["start"] = from_minutes(row[4]).strftime(TIME_FORMAT)
+    return entry
+
+
+def entry_row(profile, e):
+    return (profile, parse_minutes(e["time"]), e["task"], e["outcome"], e["xp"],
+            parse_minutes(e["start"]) if "start" in e else None)
+
+
+class SqliteLog:
+    # The XP log as rows, with the interface of xp_log.LogFile
+
+    def __init__(self, db, profile):
+        self.db = db
+        self.profile = profile
+
+    def exists(self):
+        with self.db.connection() as conn:
+            return conn.execute(LOG_ANY, (self.profile,)).fetchone() is not None
+
+    def append(self, entries):
+        if not entries:
+            return
+        with self.db.connection() as conn:
+            conn.executemany(INSERT_ENTRY, [entry_row(self.profile, e) for e in entries])
+
+    def tail_page(self, page=0, size=xp_log.PAGE_SIZE):
+        # Returns (entries, has_older) like xp_log.tail_page
+        with self.db.connection() as conn:
+            rows = conn.execute(
+                LOG_PAGE, (self.profile, size + 1, page * size)).fetchall()
+        return [make_entry(row) for row in reversed(rows[:size])], len(rows) > size
+
+    def read_day(self, day):
+        start = day_minutes(day)
+        with self.db.connection() as conn:
+            rows = conn.execute(
+                LOG_RANGE, (self.profile, start, start + DAY_MINUTES)).fetchall()
+        return [make_entry(row) for row in rows]
+
+    def read_from(self, day):
+        with self.db.connection() as conn:
+            rows = conn.execute(LOG_FROM, (self.profile, day_minutes(day))).fetchall()
+        return [make_entry(row) for row in rows]
+
+    def cursor(self):
+        with self.db.connection() as conn:
+            row = conn.execute(LOG_LAST, (self.profile,)).fetchone()
+        return row[0] if row else 0
+
+    def entries_since(self, cursor):
+        # (entries with ids after the cursor, new cursor)
+        with self.db.connection() as conn:
+            rows = conn.execute(LOG_SINCE, (self.profile, cursor)).fetchall()
+        return [make_entry(row) for row in rows], rows[-1][5] if rows else cursor
+
+# -------------- Migration --------------
+
+
+def json_tasks(schedule_path):
+    # Every task in the JSON files: a legacy schedule.json, the day files
+    # (with their journals) and the archive, as a snapshot or monthly files
+    paths = [schedule_path] if os.path.exists(schedule_path) else []
+    if os.path.isdir(SCHEDULE_DIR):
+        paths += [os.path.join(SCHEDULE_DIR, name)
+                  for name in sorted(os.listdir(SCHEDULE_DIR)) if name.endswith(".json")]
+    for path in paths:
+        yield from Document(path, [], journal=True, item_type=Task)
+    if os.path.isdir(ARCHIVE_DIR):
+        archived = snapshot.read_all(os.path.join(ARCHIVE_DIR, ARCHIVE_NAME))
+        archived.update(read_months(ARCHIVE_DIR))
+        for day in sorted(archived):
+            yield from archived[day]
+
+
+def json_entries(log_path, legacy_path):
+    if os.path.exists(log_path):
+        return xp_log.read_all(log_path)
+    if os.path.exists(legacy_path):
+        return xp_log.parse_legacy(legacy_path)
+    return iter(())
+
+
+def migrate(path=DB_PATH, profile_path="profile.json", schedule_path="schedule.json",
+            log_path=xp_log.LOG_PATH, legacy_log_path=xp_log.LEGACY_PATH):
+    # Imports profile, schedule and XP log into a new database in one
+    # transaction. The JSON files are left in place but no longer read.
+    # The database is built beside `path` and only moved there once the
+    # import succeeded, since connect() uses whatever file is at `path`.
+    if os.path.exists(path):
+        raise RuntimeError(f"{path} already exists.")
+    tmp = path + ".tmp"
+    remove_database(tmp)
+    db = Database(tmp)
+    try:
+        with db.connection() as conn:
+            if os.path.exists(profile_path):
+                with open(profile_path, 'r', encoding='utf-8') as f:
+                    conn.execute(SAVE_DOCUMENT, (profile_path, f.read()))
+            tasks = conn.executemany(INSERT_TASK, (
+                (profile_path, t.name, t.start, t.duration, t.xp, t.status)
+                for t in json_tasks(schedule_path))).rowcount
+            entries = conn.executemany(INSERT_ENTRY, (
+                entry_row(profile_path, e)
+                for e in json_entries(log_path, legacy_log_path))).rowcount
+    except BaseException:
+        db.close()
+        remove_database(tmp)
+        raise
+    db.close()  # the last connection checkpoints and removes the WAL
+    os.replace(tmp, path)
+    return tasks, entries
+
+
+def remove_database(path):
+    for name in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(name):
+            os.remove(name)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["migrate"]:
+        try:
+            tasks, entries = migrate(*args[1:2])
+        except RuntimeError as e:
+            print(f"❌ {e}")
+        except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+            print(f"❌ Migration failed, nothing was written: {type(e).__name__}: {e}")
+            sys.exit(1)
+        else:
+            print(f"Imported {tasks} tasks and {entries} log entries.")
+    else:
+        print("Usage: python sqlite_store.py migrate [perfect_u.db]")
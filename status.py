@@ -0,0 +1,168 @@
+import json
+import os
+import sys
+from datetime import date, datetime
+
+from progression import decay, level_progress
+
+# Reads the same files as the app (or perfect_u.db), but only the profile
+# and today's day file or rows, and writes nothing: decay due since the
+# last start is applied to the shown XP only. Meant for shell prompts and
+# status bars, so it imports no UI, engine or analytics modules; check()
+# and test_checks.py hold it to IMPORT_BUDGET_MS.
+PROFILE_PATH = "profile.json"
+SCHEDULE_DIR = "schedule"
+DB_PATH = "perfect_u.db"
+# On top of the json and datetime imports it cannot do without
+IMPORT_BUDGET_MS = 5
+STDLIB = "json, os, sys, datetime"
+# Modules that must stay out of a status run
+FORBIDDEN = ("tkinter", "numpy", "analytics", "forecast", "engine", "perfect_u",
+             "Widget", "screen", "sqlite_store", "metrics", "cProfile")
+BAR_WIDTH = 20
+
+# -------------- Reading --------------
+
+
+def read_json_state(now):
+    # (profile, [(name, start, end)] in minutes of today) from the JSON
+    # files: today's partition plus its journal of pending changes
+    with open(PROFILE_PATH, 'r', encoding='utf-8') as f:
+        profile = json.load(f)
+    path = os.path.join(SCHEDULE_DIR, now.strftime("%Y-%m-%d") + ".json")
+    tasks = []
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            tasks = json.load(f)
+    if os.path.exists(path + ".journal"):
+        with open(path + ".journal", 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    break
+                if op["op"] == "append" and op["i"] >= len(tasks):
+                    tasks.append(op["item"])
+                elif op["op"] == "update":
+                    tasks[op["i"]].update(op["fields"])
+    slots = []
+    for t in tasks:
+        start = int(t["start"][11:13]) * 60 + int(t["start"][14:16])
+        slots.append((t["name"], start, start + t["duration"]))
+    return profile, slots
+
+
+def read_db_state(now):
+    # The same from the SQLite database: one document and one day's rows
+    import sqlite3
+
+    epoch = datetime(1970, 1, 1)
+    today = int((datetime.combine(now.date(), datetime.min.time()) - epoch).total_seconds()) // 60
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    try:
+        row = conn.execute("SELECT data FROM documents WHERE path = ?",
+                           (PROFILE_PATH,)).fetchone()
+        rows = conn.execute("SELECT name, start, duration FROM tasks WHERE profile = ? "
+                            "AND start >= ? AND start < ? ORDER BY start",
+                            (PROFILE_PATH, today, today + 24 * 60)).fetchall()
+    finally:
+        conn.close()
+    if row is None:
+        raise FileNotFoundError(f"no profile in {DB_PATH}")
+    return json.loads(row[0]), [(name, start - today, start - today + duration)
+                                for name, start, duration in rows]
+
+
+def status(now=None):
+    now = now or datetime.now()
+    read = read_db_state if os.path.exists(DB_PATH) else read_json_state
+    profile, slots = read(now)
+    days = (now.date() - date.fromisoformat(profile["last_active"])).days
+    xp = decay(profile["xp"], days) if days > 0 else profile["xp"]
+    minute = now.hour * 60 + now.minute
+    current = next((s for s in sorted(slots, key=lambda s: s[1])
+                    if s[1] <= minute < s[2]), None)
+    upcoming = min((s for s in slots if s[1] > minute), key=lambda s: s[1], default=None)
+    level, into, span = level_progress(xp)
+    return {"xp": xp, "level": level, "into": into, "span": span,
+            "current": current and {"name": current[0], "until": hhmm(current[2])},
+            "next": upcoming and {"name": upcoming[0], "at": hhmm(upcoming[1])}}
+
+# -------------- Formatting --------------
+
+
+def hhmm(minutes):
+    return f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"
+
+
+def format_status(result):
+    filled = result["into"] * BAR_WIDTH // result["span"]
+    bar = "[" + "=" * filled + " " * (BAR_WIDTH - filled) + "]"
+    current = f"{result['current']['name']} until {result['current']['until']}" \
+        if result["current"] else "None"
+    upcoming = f"{result['next']['name']} at {result['next']['at']}" \
+        if result["next"] else "None"
+    return f"🧬 L{result['level']} {bar} {result['into']}/{result['span']} XP | " \
+           f"🔴 {current} | 🟡 {upcoming}"
+
+# -------------- Check --------------
+
+
+def import_ms():
+    # What importing this module adds, from python -X importtime in a fresh
+    # interpreter that has already imported the STDLIB modules. Bytecode
+    # writing stays on, as for a prompt run many times a day, so only the
+    # first of the runs compiles.
+    import subprocess
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {STDLIB}; import status"],
+        cwd=here, env=env, capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == "status":
+            return int(fields[1]) / 1000
+    raise RuntimeError("status missing from the import time report")
+
+
+def loaded_modules(directory=None):
+    # Modules a status run (status() and formatting) pulls in, run in a
+    # profile directory (by default this one)
+    import subprocess
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = (f"import sys\nsys.path.insert(0, {here!r})\nimport status\n"
+            "try:\n    status.format_status(status.status())\n"
+            "except (OSError, KeyError, ValueError):\n    pass\n"
+            "print('\\n'.join(sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=directory or here,
+                            capture_output=True, text=True, check=True)
+    return set(result.stdout.split())
+
+
+def check():
+    # Best of three, as the first run also pays for cold caches
+    took = min(import_ms() for _ in range(3))
+    assert took <= IMPORT_BUDGET_MS, f"import took {took:.1f} ms, over {IMPORT_BUDGET_MS} ms"
+    pulled = sorted(loaded_modules() & set(FORBIDDEN))
+    assert not pulled, f"status imports {', '.join(pulled)}"
+    return took
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args == ["--check"]:
+        print(f"OK: imported in {check():.1f} ms over {STDLIB} "
+              f"(budget {IMPORT_BUDGET_MS} ms), no UI or analytics modules.")
+    elif args in ([], ["--json"]):
+        try:
+            result = status()
+        except (OSError, KeyError, ValueError) as e:
+            print(f"No profile here ({e}).", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(result) if args else format_status(result))
+    else:
+        print("Usage: python status.py [--json | --check]")
+        sys.exit(1)
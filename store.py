@@ -0,0 +1,192 @@
+import json
+import os
+import tempfile
+
+import metrics
+
+COMPACT_EVERY = 500
+
+# -------------- Files --------------
+
+
+def write_atomic(path, text):
+    # Write to a sibling temp file, fsync, then rename over the target;
+    # text may also be bytes
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(
+        dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with (os.fdopen(fd, 'wb') if isinstance(text, bytes)
+              else os.fdopen(fd, 'w', encoding='utf-8')) as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+            metrics.file_bytes(path, "written", os.fstat(f.fileno()).st_size)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+# -------------- Backends --------------
+
+
+class FileBackend:
+    # One JSON file per document path
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+    def load(self, path, default):
+        if not os.path.exists(path):
+            self.write(path, json.dumps(default, indent=4))
+        with open(path, 'r', encoding='utf-8') as f:
+            metrics.file_bytes(path, "read", os.fstat(f.fileno()).st_size)
+            return json.load(f)
+
+    def write(self, path, text):
+        write_atomic(path, text)
+
+
+# Where load_json/save_json and Documents read and write; replaced with
+# use_backend (see sqlite_store.SqliteBackend)
+BACKEND = FileBackend()
+
+
+def use_backend(backend):
+    global BACKEND
+    BACKEND = backend
+
+
+def load_json(path, default):
+    return BACKEND.load(path, default)
+
+
+def save_json(path, data):
+    BACKEND.write(path, json.dumps(data, indent=4))
+
+# -------------- Documents --------------
+
+
+class Document:
+    # A JSON document that is only written when its content changed.
+    # With journal=True, list documents record append/update operations in
+    # an append-only "<path>.journal" instead of rewriting the whole file,
+    # and are compacted back into <path> every COMPACT_EVERY operations.
+    # With item_type, list items are kept as item_type objects in memory and
+    # converted with item_type.from_dict / to_dict only when read or written.
+
+    def __init__(self, path, default, journal=False, item_type=None):
+        self.path = path
+        self.journal_path = path + ".journal" if journal else None
+        self.item_type = item_type
+        self.data = self.decode(load_json(path, default))
+        self.pending = []
+        self.journal_len = 0
+        if self.journal_path:
+            self.replay()
+            self.saved = None
+        else:
+            # Compact dumps use the C encoder; only writes are indented
+            self.saved = json.dumps(self.raw())
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, i):
+        return self.data[i]
+
+    def position(self, item):
+        return self.data.index(item)
+
+    def decode(self, data):
+        if self.item_type is None:
+            return data
+        return [self.item_type.from_dict(item) for item in data]
+
+    def encode(self, item):
+        return item if self.item_type is None else item.to_dict()
+
+    def raw(self):
+        if self.item_type is None:
+            return self.data
+        return [item.to_dict() for item in self.data]
+
+    def append(self, item):
+        self.data.append(item)
+        self.record({"op": "append", "i": len(self.data) - 1,
+                     "item": self.encode(item)})
+
+    def update(self, i, **fields):
+        item = self.data[i]
+        if self.item_type is None:
+            item.update(fields)
+        else:
+            for key, value in fields.items():
+                setattr(item, key, value)
+            encoded = item.to_dict()
+            fields = {key: encoded[key] for key in fields}
+        self.record({"op": "update", "i": i, "fields": fields})
+
+    def record(self, op):
+        if self.journal_path:
+            self.pending.append(op)
+
+    def replay(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            metrics.file_bytes(self.journal_path, "read", os.fstat(f.fileno()).st_size)
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    break  # torn final line from an interrupted append
+                if op["op"] == "append":
+                    # Appends already folded in by a compaction are skipped
+                    if op["i"] >= len(self.data):
+                        self.data.extend(self.decode([op["item"]]))
+                elif op["op"] == "update":
+                    item = self.data[op["i"]]
+                    if self.item_type is None:
+                        item.update(op["fields"])
+                    else:
+                        encoded = item.to_dict()
+                        encoded.update(op["fields"])
+                        self.data[op["i"]] = self.item_type.from_dict(encoded)
+                self.journal_len += 1
+
+    def flush(self):
+        if not self.journal_path:
+            raw = self.raw()
+            text = json.dumps(raw)
+            if text == self.saved:
+                return False
+            BACKEND.write(self.path, json.dumps(raw, indent=4))
+            self.saved = text
+            return True
+
+        if not self.pending:
+            return False
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            text = "".join(json.dumps(op) + "\n" for op in self.pending)
+            f.write(text)
+            f.flush()
+            metrics.file_bytes(self.journal_path, "written", len(text.encode('utf-8')))
+            os.fsync(f.fileno())
+        self.journal_len += len(self.pending)
+        self.pending = []
+        if self.journal_len >= COMPACT_EVERY:
+            self.compact()
+        return True
+
+    def compact(self):
+        save_json(self.path, self.raw())
+        self.pending = []
+        if self.journal_path and os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.journal_len = 0
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+import metrics
+
+TIME_FORMAT = "%Y-%m-%d %H:%M"
+EPOCH = datetime(1970, 1, 1)
+
+# Status codes and the icons they are stored and shown as
+PENDING, ACTIVE, DONE, MISSED = range(4)
+STATUSES = ("⏳", "🕒", "✓", "X")
+STATUS_CODES = {icon: code for code, icon in enumerate(STATUSES)}
+
+# Interned task names: Task keeps an index into NAMES
+NAMES = []
+NAME_IDS = {}
+
+# -------------- Minute Keys --------------
+
+
+def to_minutes(dt):
+    return (dt - EPOCH) // timedelta(minutes=1)
+
+
+def from_minutes(minutes):
+    return EPOCH + timedelta(minutes=minutes)
+
+
+def parse_minutes(text):
+    # Fixed-width "%Y-%m-%d %H:%M"; much cheaper than strptime
+    metrics.count("datetime_parses")
+    return to_minutes(datetime(int(text[0:4]), int(text[5:7]), int(text[8:10]),
+                               int(text[11:13]), int(text[14:16])))
+
+
+def format_hhmm(minutes):
+    return f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"
+
+
+def format_day(minutes):
+    return from_minutes(minutes).strftime("%Y-%m-%d")
+
+
+def name_id(name):
+    if name not in NAME_IDS:
+        NAME_IDS[name] = len(NAMES)
+        NAMES.append(name)
+    return NAME_IDS[name]
+
+# -------------- Task Record --------------
+
+
+class Task:
+    # Start and end are minutes since EPOCH; strings only exist in JSON
+    __slots__ = ("name_id", "start", "end", "xp", "status")
+
+    def __init__(self, name, start, duration, xp, status=PENDING):
+        self.name_id = name_id(name)
+        self.start = start
+        self.end = start + duration
+        self.xp = xp
+        self.status = status
+
+    @property
+    def name(self):
+        return NAMES[self.name_id]
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    @property
+    def icon(self):
+        return STATUSES[self.status]
+
+    @property
+    def day(self):
+        return format_day(self.start)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["name"], parse_minutes(data["start"]), data["duration"],
+                   data["xp"], STATUS_CODES[data["status"]])
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "start": from_minutes(self.start).strftime(TIME_FORMAT),
+            "duration": self.duration,
+            "xp": self.xp,
+            "status": self.icon
+        }
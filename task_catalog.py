@@ -0,0 +1,121 @@
+import os
+import re
+import sys
+from bisect import bisect_left
+
+from store import load_json
+
+TASKS_PATH = "tasks.json"
+PAGE_SIZE = 20
+
+# -------------- Catalog --------------
+
+
+class Catalog:
+    # tasks.json parsed once and parsed again only when the file's mtime or
+    # size changes, with a name index for the pickers:
+    #   - names starting with the query ("ru" finds "Run")
+    #   - then names with a word starting with it ("Morning Run")
+    #   - then names holding its letters in order ("rn" finds "Run")
+    # Names starting with the query go shortest first; the other groups
+    # keep the file's order. A query extending the last one only
+    # re-checks the last one's matches.
+
+    def __init__(self, path=TASKS_PATH):
+        self.path = path
+        self.stamp = None
+        self.loaded = False
+        self.tasks = []
+        self.by_name = {}
+        self.names = []
+        self.words = []
+        self.last = ("", None)
+
+    def refresh(self):
+        # True when the file was (re)parsed
+        try:
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None  # created by load_json, or a document in SQLite
+        if self.loaded and stamp == self.stamp and stamp is not None:
+            return False
+        self.tasks = load_json(self.path, {"tasks": []}).get("tasks", [])
+        self.stamp = stamp
+        self.loaded = True
+        self.by_name = {t["name"]: t for t in self.tasks}
+        self.names = [t["name"].casefold() for t in self.tasks]
+        # (text from a word start to the end of the name, task position)
+        self.words = sorted((name[m.start():], i) for i, name in enumerate(self.names)
+                            for m in re.finditer(r"\w+", name))
+        self.last = ("", None)
+        return True
+
+    def prefixed(self, query):
+        # Positions with a word starting with query, from the sorted words
+        lo = bisect_left(self.words, (query,))
+        hi = bisect_left(self.words, (query + "\U0010ffff",))
+        return {i for _, i in self.words[lo:hi]}
+
+    def search(self, query):
+        # Matching tasks, best first; every task for an empty query
+        self.refresh()
+        query = query.strip().casefold()
+        if not query:
+            return self.tasks
+        previous, found = self.last
+        candidates = found if found is not None and query.startswith(previous) \
+            else range(len(self.tasks))
+        words = self.prefixed(query)
+        pattern = re.compile(".*?".join(map(re.escape, query)))
+        starts, inner, fuzzy = [], [], []
+        for i in candidates:
+            name = self.names[i]
+            if name.startswith(query):
+                starts.append(i)
+            elif i in words:
+                inner.append(i)
+            elif pattern.search(name):
+                fuzzy.append(i)
+        # The closest (shortest) names first
+        starts.sort(key=lambda i: (len(self.names[i]), i))
+        found = starts + sorted(inner) + sorted(fuzzy)
+        self.last = (query, found)
+        return [self.tasks[i] for i in found]
+
+
+# One per path, shared by the pickers, templates and stats
+CATALOGS = {}
+
+
+def load(path=TASKS_PATH):
+    # Keyed by absolute path: team.py works in one directory after another
+    key = os.path.abspath(path)
+    if key not in CATALOGS:
+        CATALOGS[key] = Catalog(key)
+    CATALOGS[key].refresh()
+    return CATALOGS[key]
+
+
+def page_of(results, page, size=PAGE_SIZE):
+    # (the page's tasks with their 1-based numbers, page clamped to the
+    # last one, number of pages)
+    pages = max(1, -(-len(results) // size))
+    page = max(0, min(page, pages - 1))
+    start = page * size
+    return list(enumerate(results[start:start + size], start + 1)), page, pages
+
+
+def format_task(task):
+    return f"{task['name']} – {task['duration']}min, {task['xp']} XP"
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python task_catalog.py <query> [tasks.json]")
+        sys.exit(1)
+    catalog = load(sys.argv[2] if len(sys.argv) > 2 else TASKS_PATH)
+    results = catalog.search(sys.argv[1])
+    for number, task in page_of(results, 0)[0]:
+        print(f"[{number}] {format_task(task)}")
+    print(f"{len(results)} of {len(catalog.tasks)} tasks match.")
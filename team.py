@@ -0,0 +1,241 @@
+import argparse
+import heapq
+import json
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import analytics
+import clock
+import sqlite_store
+import store
+import xp_log
+from daemon import SOCKET_PATH
+from engine import Engine
+from schedule_store import SCHEDULE_DIR
+from store import load_json, save_json
+
+STATE_NAME = "leaderboard.json"
+TOP_K = 10
+# A profile is rescanned when one of these changed since the last pass, or
+# when it has not been processed today (decay and rollover are due)
+WATCHED = ("profile.json", "templates.json", "tasks.json", xp_log.LOG_PATH,
+           SCHEDULE_DIR, sqlite_store.DB_PATH, sqlite_store.DB_PATH + "-wal")
+BOARDS = {
+    "xp": lambda p: p["xp"],
+    "level": lambda p: (p["level"], p["xp"]),
+    "streak": lambda p: (p["streak"], p["xp"]),
+}
+
+# `python team.py ROOT` processes every profile directory under ROOT (one
+# per person, each laid out as the app's working directory) without a UI:
+# midnight decay, schedule rollover, today's recurring tasks and the level,
+# through the same Engine the front-ends start. The pass also keeps a top-K
+# leaderboard by XP, level and streak in ROOT/leaderboard.json.
+
+# -------------- Profiles --------------
+
+
+def stamp(directory):
+    stamps = []
+    for name in WATCHED:
+        try:
+            stamps.append(os.stat(os.path.join(directory, name)).st_mtime_ns)
+        except OSError:
+            stamps.append(0)
+    return stamps
+
+
+def daemon_running():
+    # Something listening on the profile's daemon socket
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(SOCKET_PATH):
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(SOCKET_PATH)
+            return True
+        except OSError:
+            return False
+
+
+def process(directory, now):
+    # Runs in a pool worker; the Engine's paths are relative, so it works
+    # from inside the profile directory
+    cwd = os.getcwd()
+    previous = clock.CLOCK, store.BACKEND
+    db = None
+    try:
+        os.chdir(directory)
+        if daemon_running():
+            # The daemon owns this profile and applies midnight itself
+            return {"skipped": "daemon running"}
+        db = sqlite_store.connect()
+        store.use_backend(store.FileBackend())
+        clock.use_clock(clock.ManualClock(now))
+        engine = Engine({}, now, clock_minutes=False, db=db)
+        engine.tick(now)
+        stats = analytics.load_stats(engine.log, now.date())
+        return {"xp": engine.profile.get("xp", 0), "level": engine.profile.get("level", 1),
+                "streak": stats.get("streak", 0) if stats else 0}
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    finally:
+        clock.use_clock(previous[0])
+        store.use_backend(previous[1])
+        if db:
+            db.close()
+        os.chdir(cwd)
+
+
+def profile_dirs(root):
+    return sorted(entry.name for entry in os.scandir(root) if entry.is_dir() and (
+        os.path.exists(os.path.join(entry.path, "profile.json")) or
+        os.path.exists(os.path.join(entry.path, sqlite_store.DB_PATH))))
+
+# -------------- Leaderboard --------------
+
+
+class Leaderboard:
+    # The `size` best profiles by one score. A min-heap holds the current
+    # top, so a profile whose score rises only has to beat its smallest
+    # entry. Replaced entries stay in the heap until they surface and are
+    # skipped. Only when a profile in the top drops (or leaves) can one
+    # from outside overtake it, and only then is the heap rebuilt from
+    # every score.
+
+    def __init__(self, size, scores=None):
+        self.size = size
+        self.scores = dict(scores or {})
+        self.rebuild()
+
+    def rebuild(self):
+        self.heap = heapq.nlargest(
+            self.size, ((score, name) for name, score in self.scores.items()))
+        heapq.heapify(self.heap)
+        self.members = {name for _, name in self.heap}
+        self.stale = False
+
+    def clean(self):
+        while self.heap and (self.heap[0][1] not in self.members or
+                             self.scores.get(self.heap[0][1]) != self.heap[0][0]):
+            heapq.heappop(self.heap)
+
+    def update(self, name, score):
+        old = self.scores.get(name)
+        self.scores[name] = score
+        if self.stale:
+            return  # top() rebuilds from the scores anyway
+        if name in self.members:
+            if old is not None and score < old:
+                self.stale = True
+            else:
+                heapq.heappush(self.heap, (score, name))
+        elif len(self.members) < self.size:
+            heapq.heappush(self.heap, (score, name))
+            self.members.add(name)
+        else:
+            self.clean()
+            if (score, name) > self.heap[0]:
+                _, out = heapq.heappushpop(self.heap, (score, name))
+                self.members.discard(out)
+                self.members.add(name)
+
+    def remove(self, name):
+        if self.scores.pop(name, None) is not None and name in self.members:
+            self.stale = True
+
+    def top(self):
+        if self.stale:
+            self.rebuild()
+        return sorted(((self.scores[name], name) for name in self.members), reverse=True)
+
+# -------------- Batch --------------
+
+
+def run(root, top=TOP_K, workers=None, full=False, now=None):
+    # Returns (summary, {board: [(name, profile entry), ...]})
+    now = now or clock.now()
+    began = time.perf_counter()
+    state_path = os.path.join(root, STATE_NAME)
+    state = load_json(state_path, {"profiles": {}})
+    profiles = state["profiles"]
+    boards = {key: Leaderboard(top, {name: score(entry) for name, entry in profiles.items()
+                                     if "xp" in entry})
+              for key, score in BOARDS.items()}
+
+    names = profile_dirs(root)
+    for name in set(profiles) - set(names):
+        del profiles[name]
+        for board in boards.values():
+            board.remove(name)
+    today = now.date().isoformat()
+    due = [name for name in names if full or name not in profiles or
+           profiles[name].get("day") != today or
+           profiles[name].get("stamp") != stamp(os.path.join(root, name))]
+
+    paths = [os.path.abspath(os.path.join(root, name)) for name in due]
+    pool = None
+    if workers == 1 or len(paths) < 2:
+        results = map(process, paths, [now] * len(paths))
+    else:
+        pool = ProcessPoolExecutor(workers)
+        chunk = max(1, len(paths) // ((workers or os.cpu_count() or 1) * 4))
+        results = pool.map(process, paths, [now] * len(paths), chunksize=chunk)
+    summary = {"profiles": len(names), "processed": 0, "unchanged": len(names) - len(due),
+               "skipped": 0, "errors": []}
+    try:
+        for name, path, result in zip(due, paths, results):
+            if "error" in result or "skipped" in result:
+                if "error" in result:
+                    summary["errors"].append(f"{name}: {result['error']}")
+                else:
+                    summary["skipped"] += 1
+                profiles.pop(name, None)
+                for board in boards.values():
+                    board.remove(name)
+                continue
+            # Stamped after this pass's own writes
+            profiles[name] = {**result, "day": today, "stamp": stamp(path)}
+            for key, score in BOARDS.items():
+                boards[key].update(name, score(profiles[name]))
+            summary["processed"] += 1
+    finally:
+        if pool:
+            pool.shutdown()
+
+    save_json(state_path, state)
+    summary["elapsed_ms"] = round((time.perf_counter() - began) * 1000, 1)
+    return summary, {key: [(name, profiles[name]) for _, name in board.top()]
+                     for key, board in boards.items()}
+
+
+def format_boards(summary, boards):
+    lines = [f"{summary['profiles']} profiles: {summary['processed']} processed, "
+             f"{summary['unchanged']} unchanged, {summary['skipped']} skipped "
+             f"in {summary['elapsed_ms']:.0f} ms"]
+    titles = {"xp": "🏆 XP", "level": "🧬 Level", "streak": "🔥 Streak"}
+    for key, rows in boards.items():
+        lines.append(f"\n{titles[key]}")
+        for rank, (name, entry) in enumerate(rows, 1):
+            lines.append(f"{rank:>3}. {name:<20} L{entry['level']:<4} {entry['xp']:>8} XP "
+                         f"{entry['streak']:>4} day streak")
+    return lines + [f"⚠️ {error}" for error in summary["errors"]]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Nightly decay, rollover and levels for many profile directories, "
+                    "and a leaderboard.")
+    parser.add_argument("root", help="directory holding one profile directory per person")
+    parser.add_argument("--top", type=int, default=TOP_K, help="leaderboard size")
+    parser.add_argument("--workers", type=int, help="processes (default: one per CPU)")
+    parser.add_argument("--full", action="store_true",
+                        help="rescan every profile, not only changed ones")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args()
+    summary, boards = run(args.root, args.top, args.workers, args.full)
+    if args.json:
+        print(json.dumps({"summary": summary, "leaderboard": boards}))
+    else:
+        print("\n".join(format_boards(summary, boards)))
@@ -0,0 +1,88 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import analytics
+import progression
+import sqlite_store
+import status
+from task import Task, to_minutes
+
+# The self-checks the modules ship with (python progression.py --check,
+# python analytics.py --check, python status.py --check), run by pytest.
+
+NOW = datetime(2026, 3, 10, 9, 15)
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    # A JSON profile with a task running at NOW and one after it
+    monkeypatch.chdir(tmp_path)
+    with open("profile.json", 'w', encoding='utf-8') as f:
+        json.dump({"username": "Test", "xp": 800, "love_xp": 0, "level": 1,
+                   "last_active": NOW.strftime("%Y-%m-%d"), "xp_history": [0] * 7}, f)
+    os.makedirs(status.SCHEDULE_DIR)
+    day = NOW.replace(hour=0, minute=0)
+    tasks = [Task("Run", to_minutes(day + timedelta(hours=9)), 45, 20),
+             Task("Read", to_minutes(day + timedelta(hours=11)), 30, 10)]
+    with open(os.path.join(status.SCHEDULE_DIR, NOW.strftime("%Y-%m-%d") + ".json"),
+              'w', encoding='utf-8') as f:
+        json.dump([t.to_dict() for t in tasks], f)
+    return tmp_path
+
+# -------------- Progression --------------
+
+
+def test_progression_matches_level_loop():
+    assert progression.check(samples=1000) > 0
+
+# -------------- Analytics --------------
+
+
+def test_analytics_streaks():
+    # Compares NumPy and list stats too when NumPy is installed
+    analytics.check()
+
+
+def test_runs_stop_at_yesterday():
+    assert analytics.runs([True, True, False, False, False, False]) == (0, 2)
+    assert analytics.runs([True, True, False]) == (2, 2)
+
+# -------------- Status --------------
+
+
+def test_status_import_budget():
+    took = min(status.import_ms() for _ in range(3))
+    assert took <= status.IMPORT_BUDGET_MS, f"status adds {took:.1f} ms"
+
+
+def test_status_imports_no_ui_or_analytics(profile_dir):
+    pulled = status.loaded_modules(str(profile_dir)) & set(status.FORBIDDEN)
+    assert not pulled
+
+
+def test_status_reads_json(profile_dir):
+    result = status.status(NOW)
+    assert result["current"] == {"name": "Run", "until": "09:45"}
+    assert result["next"] == {"name": "Read", "at": "11:00"}
+    assert (result["level"], result["into"]) == progression.level_progress(800)[:2]
+
+
+def test_status_reads_sqlite(profile_dir):
+    os.rename(os.path.join(status.SCHEDULE_DIR, NOW.strftime("%Y-%m-%d") + ".json"),
+              "schedule.json")
+    sqlite_store.migrate()
+    pulled = status.loaded_modules(str(profile_dir)) & set(status.FORBIDDEN)
+    assert not pulled
+    result = status.status(NOW)
+    assert result["current"]["name"] == "Run"
+    assert result["next"]["name"] == "Read"
+
+
+def test_status_shows_decay_without_writing(profile_dir):
+    later = NOW + timedelta(days=2)
+    assert status.status(later)["xp"] == progression.decay(800, 2)
+    with open("profile.json", 'r', encoding='utf-8') as f:
+        assert json.load(f)["xp"] == 800
@@ -0,0 +1,186 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import snapshot
+import sqlite_store
+import store
+import xp_log
+from task import DONE, MISSED, PENDING, Task, to_minutes
+
+# Round trips through the persistence code: the SQLite migration, the
+# archive snapshot and the Document journal.
+
+NOW = datetime(2026, 3, 10, 9, 15)
+
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+def at(days, hour):
+    # A start minute `days` before NOW's day, at `hour`
+    return to_minutes(NOW.replace(hour=hour, minute=0) - timedelta(days=days))
+
+
+@pytest.fixture
+def json_profile(tmp_path, monkeypatch):
+    # profile.json, a legacy schedule.json (two past days and today) and
+    # an XP log
+    monkeypatch.chdir(tmp_path)
+    write_json("profile.json", {"username": "Test", "xp": 120})
+    tasks = [Task("Run", at(2, 7), 30, 20, DONE), Task("Read", at(1, 21), 30, 10, MISSED),
+             Task("Gym", at(0, 18), 60, 40, PENDING)]
+    write_json("schedule.json", [t.to_dict() for t in tasks])
+    xp_log.append([xp_log.make_entry(NOW - timedelta(days=2), "Run", "done", 20,
+                                     NOW - timedelta(days=2, hours=2)),
+                   xp_log.make_entry(NOW - timedelta(days=1), "Read", "missed", -5)])
+    return tmp_path
+
+# -------------- SQLite migration --------------
+
+
+def test_migrate_round_trip(json_profile):
+    assert sqlite_store.migrate() == (3, 2)
+    db = sqlite_store.connect()
+    try:
+        assert sqlite_store.SqliteBackend(db).load("profile.json", {})["xp"] == 120
+        schedule = sqlite_store.SqliteSchedule(db, "profile.json", NOW)
+        assert [(t.name, t.status) for t in schedule] == [("Gym", PENDING)]
+        past = dict(sqlite_store.read_history(db, "profile.json", NOW))
+        assert [[t.name for t in tasks] for tasks in past.values()] == [["Run"], ["Read"]]
+        log = sqlite_store.SqliteLog(db, "profile.json")
+        assert log.entries_since(0)[0] == list(xp_log.read_all())
+    finally:
+        db.close()
+
+
+def test_failed_migrate_leaves_no_database(json_profile):
+    with open(xp_log.LOG_PATH, 'a', encoding='utf-8') as f:
+        f.write("{not json\n")
+    with pytest.raises(ValueError):
+        sqlite_store.migrate()
+    assert sqlite_store.connect() is None
+    assert not [name for name in os.listdir() if name.startswith(sqlite_store.DB_PATH)]
+    # and the fixed files migrate on the next try
+    lines = open(xp_log.LOG_PATH, encoding='utf-8').readlines()[:-1]
+    with open(xp_log.LOG_PATH, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+    assert sqlite_store.migrate() == (3, 2)
+
+
+def test_migrate_keeps_an_existing_database(json_profile):
+    sqlite_store.migrate()
+    with pytest.raises(RuntimeError):
+        sqlite_store.migrate()
+
+# -------------- Archive snapshot --------------
+
+
+def archived_days():
+    # Three days out of order, a repeated name and a non-ASCII one
+    return {
+        "2026-03-08": [Task("Read", at(2, 21), 30, 10, MISSED), Task("Run", at(2, 7), 30, 20, DONE)],
+        "2026-02-27": [Task("Läufe", at(11, 6), 45, 25, DONE)],
+        "2026-03-09": [Task("Run", at(1, 7), 30, 20, DONE)],
+    }
+
+
+def as_dicts(days):
+    return {day: [t.to_dict() for t in tasks] for day, tasks in days.items()}
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "archive.snap")
+    days = archived_days()
+    snapshot.write(path, days)
+    # Days come back sorted, and each day's tasks by start
+    expected = {day: sorted(days[day], key=lambda t: t.start) for day in sorted(days)}
+    assert as_dicts(snapshot.read_all(path)) == as_dicts(expected)
+    with snapshot.Snapshot(path) as snap:
+        assert len(snap) == 4
+        assert [t.name for t in snap.day("2026-03-08")] == ["Run", "Read"]
+        assert snap.day("2026-02-27")[0].name == "Läufe"
+        assert snap.day("2026-03-01") == []
+        assert snap.day("2027-01-01") == []
+        assert [day for day, _ in snap.history("2026-03-01", "2026-03-08")] == ["2026-03-08"]
+        assert [day for day, _ in snap.history(end="2026-03-08")] == ["2026-02-27", "2026-03-08"]
+
+
+def test_snapshot_json_round_trip(tmp_path):
+    path, copy = str(tmp_path / "archive.snap"), str(tmp_path / "copy.snap")
+    snapshot.write(path, archived_days())
+    assert snapshot.export_json(path, str(tmp_path / "archive.json")) == 4
+    assert snapshot.import_json(str(tmp_path / "archive.json"), copy) == 4
+    assert as_dicts(snapshot.read_all(copy)) == as_dicts(snapshot.read_all(path))
+
+
+def test_snapshot_empty_and_foreign_files(tmp_path):
+    assert snapshot.read_all(str(tmp_path / "missing.snap")) == {}
+    empty = tmp_path / "empty.snap"
+    empty.write_bytes(b"")
+    with snapshot.Snapshot(str(empty)) as snap:
+        assert (len(snap), snap.day("2026-03-08"), list(snap.history())) == (0, [], [])
+    foreign = tmp_path / "foreign.snap"
+    foreign.write_bytes(b"NOPE" + bytes(snapshot.HEADER.size))
+    with pytest.raises(ValueError):
+        snapshot.Snapshot(str(foreign))
+
+# -------------- Document journal --------------
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    # A journaled task list on the file backend; returns its path
+    monkeypatch.setattr(store, "BACKEND", store.FileBackend())
+    path = str(tmp_path / "tasks.json")
+    doc = store.Document(path, [], journal=True, item_type=Task)
+    doc.append(Task("Run", at(0, 7), 30, 20))
+    doc.append(Task("Read", at(0, 21), 30, 10))
+    doc.update(0, status=DONE)
+    doc.flush()
+    return path
+
+
+def reopen(path):
+    return [t.to_dict() for t in store.Document(path, [], journal=True, item_type=Task)]
+
+
+def expected_tasks():
+    return [Task("Run", at(0, 7), 30, 20, DONE).to_dict(), Task("Read", at(0, 21), 30, 10).to_dict()]
+
+
+def test_journal_replays_without_compaction(journal):
+    with open(journal, encoding='utf-8') as f:
+        assert json.load(f) == []
+    assert reopen(journal) == expected_tasks()
+
+
+def test_journal_ignores_a_torn_last_line(journal):
+    # A crash in the middle of an append, before any compaction
+    with open(journal + ".journal", 'a', encoding='utf-8') as f:
+        f.write('{"op": "append", "i": 2, "item": {"na')
+    assert reopen(journal) == expected_tasks()
+
+
+def test_journal_after_compaction_before_removal(journal):
+    # A crash between compact()'s write and its journal removal: the
+    # journal's appends are already in the file and are skipped, and its
+    # updates apply again to the same values
+    store.save_json(journal, expected_tasks())
+    assert os.path.exists(journal + ".journal")
+    assert reopen(journal) == expected_tasks()
+
+
+def test_journal_compacts(journal, monkeypatch):
+    monkeypatch.setattr(store, "COMPACT_EVERY", 4)
+    doc = store.Document(journal, [], journal=True, item_type=Task)
+    doc.update(1, status=MISSED)
+    assert doc.flush()
+    assert not os.path.exists(journal + ".journal")
+    with open(journal, encoding='utf-8') as f:
+        assert [Task.from_dict(t).status for t in json.load(f)] == [DONE, MISSED]
+    assert [Task.from_dict(t).status for t in reopen(journal)] == [DONE, MISSED]
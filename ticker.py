@@ -0,0 +1,71 @@
+import heapq
+import itertools
+from datetime import datetime, time, timedelta
+
+from task import ACTIVE, PENDING, from_minutes, to_minutes
+
+START = "start"
+END = "end"
+WINDOW = "window"
+MIDNIGHT = "midnight"
+
+# -------------- Ticker --------------
+
+
+class Ticker:
+    # Min-heap of (minute, seq, kind) state transitions. Front-ends sleep
+    # until the earliest one; with clock_minutes they also wake on each
+    # minute boundary, but only to redraw the clock.
+
+    def __init__(self, clock_minutes=True):
+        self.heap = []
+        self.counter = itertools.count()
+        self.clock_minutes = clock_minutes
+
+    def push(self, minute, kind):
+        heapq.heappush(self.heap, (minute, next(self.counter), kind))
+
+    def track(self, task, now):
+        if task.status not in (PENDING, ACTIVE):
+            return
+        now_min = to_minutes(now)
+        if task.start > now_min:
+            self.push(task.start, START)
+        if task.end > now_min:
+            self.push(task.end, END)
+
+    def track_midnight(self, now):
+        midnight = datetime.combine(now.date() + timedelta(days=1), time.min)
+        self.push(to_minutes(midnight), MIDNIGHT)
+
+    def track_window(self, profile, now):
+        if "start_hour" not in profile or profile.get("day_started") == now.strftime("%Y-%m-%d"):
+            return
+        closes = datetime.combine(now.date(), time.min) + \
+            timedelta(hours=profile["start_hour"] + 1)
+        if closes > now:
+            self.push(to_minutes(closes), WINDOW)
+
+    def rebuild(self, profile, index, now):
+        self.heap = []
+        for task in index.entries:
+            self.track(task, now)
+        self.track_midnight(now)
+        self.track_window(profile, now)
+
+    def delay(self, now):
+        # Seconds until the next wakeup
+        delays = []
+        if self.heap:
+            delays.append(
+                (from_minutes(self.heap[0][0]) - now).total_seconds())
+        if self.clock_minutes:
+            delays.append(60 - now.second - now.microsecond / 1e6)
+        return max(0, min(delays)) if delays else None
+
+    def due(self, now):
+        now_min = to_minutes(now)
+        kinds = set()
+        while self.heap and self.heap[0][0] <= now_min:
+            kinds.add(heapq.heappop(self.heap)[2])
+        return kinds
@@ -0,0 +1,253 @@
+import json
+import mmap
+import os
+import re
+import sys
+
+import metrics
+
+LOG_PATH = "xp_log.jsonl"
+LEGACY_PATH = "xp_log.txt"
+PAGE_SIZE = 20
+
+# One JSON object per line: {"time": "YYYY-MM-DD HH:MM", "task": name,
+# "outcome": "done" | "missed", "xp": signed XP delta, "start": "YYYY-MM-DD
+# HH:MM"}. "time" is when the outcome was confirmed and orders the log;
+# "start" is when the task was scheduled, which stats bucket by. The sidecar
+# "<log>.idx" holds "YYYY-MM-DD<TAB>byte offset" for the first entry of
+# every day, so day views can seek straight to their slice.
+
+LEGACY_ENTRY = re.compile(
+    r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}) - (✅|❌) (.*) \(([+-]\d+) XP\)$")
+
+# -------------- Entries --------------
+
+
+def make_entry(now, task, outcome, xp, start=None):
+    entry = {
+        "time": now.strftime("%Y-%m-%d %H:%M"),
+        "task": task,
+        "outcome": outcome,
+        "xp": xp
+    }
+    if start is not None:
+        entry["start"] = start.strftime("%Y-%m-%d %H:%M")
+    return entry
+
+
+def entry_start(entry):
+    # When the entry's task was scheduled; older entries only have the
+    # confirmation time
+    return entry.get("start", entry["time"])
+
+
+def format_entry(entry):
+    icon = "✅" if entry["outcome"] == "done" else "❌"
+    return f"{entry['time']} - {icon} {entry['task']} ({entry['xp']:+d} XP)"
+
+
+def format_page(entries):
+    lines = []
+    day = None
+    for entry in entries:
+        if entry["time"][:10] != day:
+            day = entry["time"][:10]
+            lines.append(f"\n=== {day} ===")
+        lines.append(format_entry(entry))
+    return lines
+
+# -------------- Writing --------------
+
+
+def index_path(path):
+    return path + ".idx"
+
+
+def load_index(path=LOG_PATH):
+    if not os.path.exists(index_path(path)):
+        return []
+    with open(index_path(path), 'r', encoding='utf-8') as f:
+        metrics.file_bytes(index_path(path), "read", os.fstat(f.fileno()).st_size)
+        return [(day, int(offset)) for day, offset in
+                (line.split("\t") for line in f if line.strip())]
+
+
+def append(entries, path=LOG_PATH):
+    if not entries:
+        return
+    index = load_index(path)
+    last_day = index[-1][0] if index else None
+    new_days = []
+    with open(path, 'ab') as f:
+        start = f.tell()
+        for entry in entries:
+            day = entry["time"][:10]
+            if day != last_day:
+                new_days.append((day, f.tell()))
+                last_day = day
+            f.write((json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8'))
+        metrics.file_bytes(path, "written", f.tell() - start)
+    if new_days:
+        with open(index_path(path), 'a', encoding='utf-8') as f:
+            for day, offset in new_days:
+                f.write(f"{day}\t{offset}\n")
+        metrics.file_bytes(index_path(path), "written",
+                           sum(len(f"{day}\t{offset}\n") for day, offset in new_days))
+
+# -------------- Reading --------------
+
+
+def tail_page(page=0, size=PAGE_SIZE, path=LOG_PATH):
+    # Walks backwards from the end of the mapped file, so only the pages
+    # holding the requested lines are touched. Returns (entries, has_older).
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return [], False
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = len(mm)
+        if mm[end - 1:end] == b"\n":
+            end -= 1
+        skip = page * size
+        lines = []
+        seen = 0
+        while end > 0 and seen < skip + size:
+            start = mm.rfind(b"\n", 0, end) + 1
+            if seen >= skip:
+                lines.append(mm[start:end])
+            seen += 1
+            end = start - 1
+        has_older = end > 0
+    metrics.file_bytes(path, "read", sum(len(line) + 1 for line in lines))
+    entries = [json.loads(line) for line in reversed(lines)]
+    return entries, has_older
+
+
+def read_all(path=LOG_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_day(day, path=LOG_PATH):
+    index = load_index(path)
+    for i, (d, offset) in enumerate(index):
+        if d == day:
+            stop = index[i + 1][1] if i + 1 < len(index) else None
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = f.read() if stop is None else f.read(stop - offset)
+            metrics.file_bytes(path, "read", len(data))
+            return [json.loads(line) for line in data.splitlines() if line]
+    return []
+
+
+def read_from(day, path=LOG_PATH):
+    # Every entry from the first indexed day on or after `day`
+    start = next((offset for d, offset in load_index(path) if d >= day), None)
+    if start is None:
+        return []
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read()
+    metrics.file_bytes(path, "read", len(data))
+    return [json.loads(line) for line in data.splitlines() if line]
+
+
+class LogFile:
+    # The JSON Lines log behind the same interface as sqlite_store.SqliteLog
+
+    def __init__(self, path=LOG_PATH):
+        self.path = path
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def append(self, entries):
+        append(entries, self.path)
+
+    def tail_page(self, page=0, size=PAGE_SIZE):
+        return tail_page(page, size, self.path)
+
+    def read_day(self, day):
+        return read_day(day, self.path)
+
+    def read_from(self, day):
+        return read_from(day, self.path)
+
+    def cursor(self):
+        # Where the log ends now; entries_since(cursor) reads past it
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def entries_since(self, cursor):
+        # (entries appended after the cursor, new cursor)
+        if not os.path.exists(self.path):
+            return [], 0
+        with open(self.path, 'rb') as f:
+            f.seek(cursor)
+            data = f.read()
+        metrics.file_bytes(self.path, "read", len(data))
+        # One parse of the whole tail is much cheaper than one per line
+        lines = [line for line in data.decode('utf-8').splitlines() if line.strip()]
+        return json.loads("[" + ",".join(lines) + "]"), cursor + len(data)
+
+# -------------- Conversion --------------
+
+
+def rebuild_index(path=LOG_PATH):
+    days = []
+    last_day = None
+    offset = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                day = json.loads(line)["time"][:10]
+                if day != last_day:
+                    days.append((day, offset))
+                    last_day = day
+            offset += len(line)
+    with open(index_path(path), 'w', encoding='utf-8') as f:
+        for day, offset in days:
+            f.write(f"{day}\t{offset}\n")
+
+
+def parse_legacy(legacy_path=LEGACY_PATH):
+    # Entries of the old free-form text log; unparseable lines are skipped
+    with open(legacy_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            match = LEGACY_ENTRY.match(line.strip())
+            if match:
+                time, icon, task, xp = match.groups()
+                yield {
+                    "time": time,
+                    "task": task,
+                    "outcome": "done" if icon == "✅" else "missed",
+                    "xp": int(xp)
+                }
+
+
+def convert(legacy_path=LEGACY_PATH, path=LOG_PATH):
+    # Parses the old free-form text log into JSON Lines plus its index
+    entries = list(parse_legacy(legacy_path))
+    with open(path, 'wb') as f:
+        for entry in entries:
+            f.write((json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8'))
+    rebuild_index(path)
+    return len(entries)
+
+
+def migrate(legacy_path=LEGACY_PATH, path=LOG_PATH):
+    if os.path.exists(legacy_path) and not os.path.exists(path):
+        convert(legacy_path, path)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["convert"]:
+        count = convert(*args[1:3])
+        print(f"Converted {count} entries.")
+    elif args[:1] == ["reindex"]:
+        rebuild_index(*args[1:2])
+    else:
+        print("Usage: python xp_log.py convert [xp_log.txt] [xp_log.jsonl]")
+        print("       python xp_log.py reindex [xp_log.jsonl]")